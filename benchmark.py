@@ -0,0 +1,384 @@
+"""
+Offline benchmark for the graphics pipeline.
+
+Swaps GoogleImageCrawler for FixtureCrawler, which serves a fixed corpus of
+images with a configurable per-image delay, then runs
+run_player_image_pipeline and the Flask /generate flow end to end. Results
+are written as JSON and can be compared against an earlier run:
+
+    python benchmark.py --runs 3 --output bench_results/today.json
+    python benchmark.py --compare bench_results/today.json
+
+Per-image latency is measured from the moment the fixture hands a photo to
+the pipeline to the moment its graphic is announced. The synthetic corpus
+only holds usable, distinct photos, so the n-th photo served becomes the
+n-th graphic.
+"""
+import argparse
+import io
+import json
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from types import SimpleNamespace
+import requests
+from icrawler.utils import Signal
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+CORPUS_SIZES = [(1200, 900), (2400, 1600), (3000, 2000), (1000, 1000), (1600, 2000), (2000, 3000)]
+
+
+class FixtureCrawler:
+    """
+    Stand-in for icrawler's GoogleImageCrawler that serves FixtureCrawler.corpus.
+
+    Each keyword gets its own, half-overlapping slice of the corpus, every
+    photo takes FixtureCrawler.latency seconds to "download", and like
+    FeedDownloader the crawl skips photos another crawl into the same feed
+    already claimed and stops once the feed has enough or reach_max_num is signalled.
+    """
+
+    corpus = []
+    latency = 0.0
+    # Times each photo was handed over, per keyword, in hand-over order
+    write_log = defaultdict(list)
+    _keywords = {}
+    _lock = threading.Lock()
+
+    def __init__(self, feeder_cls=None, parser_cls=None, downloader_cls=None, storage=None,
+                 downloader_threads=1, **kwargs):
+        if isinstance(storage, dict):
+            raise ValueError("FixtureCrawler only supports storage objects, not a root_dir")
+        self.storage = storage
+        self.downloader_threads = downloader_threads
+        self.signal = Signal()
+        self.signal.set(reach_max_num=False)
+        self.session = requests.Session()
+        self.feeder = SimpleNamespace(session=None)
+        self.parser = SimpleNamespace(session=None)
+        self.downloader = SimpleNamespace(fetched_num=0, session=None)
+
+    def _stopped(self):
+        feed = getattr(self.storage, 'feed', None)
+        return self.signal.get('reach_max_num') or (feed is not None and feed.stopped.is_set())
+
+    def crawl(self, keyword, max_num=1000, filters=None, **kwargs):
+        corpus = FixtureCrawler.corpus
+        with FixtureCrawler._lock:
+            slot = FixtureCrawler._keywords.setdefault(keyword, len(FixtureCrawler._keywords))
+        start = (slot * len(corpus) // 2) % len(corpus)
+        pending = [corpus[(start + i) % len(corpus)] for i in range(min(max_num, len(corpus)))]
+        pending.reverse()
+
+        def download():
+            while not self._stopped():
+                with FixtureCrawler._lock:
+                    if not pending:
+                        return
+                    name, data = pending.pop()
+                feed = getattr(self.storage, 'feed', None)
+                if feed is not None and not feed.claim_url(name):
+                    continue
+                time.sleep(FixtureCrawler.latency)
+                # Hand-over is serialized so the log order matches the order the pipeline sees
+                with FixtureCrawler._lock:
+                    if self._stopped():
+                        return
+                    FixtureCrawler.write_log[keyword].append(time.time())
+                    self.downloader.fetched_num += 1
+                    self.storage.write(name, data)
+
+        threads = [threading.Thread(target=download) for _ in range(self.downloader_threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls.write_log = defaultdict(list)
+            cls._keywords = {}
+
+
+# Deterministic corpus of distinct, usable photos: random shapes at a mix of sizes and aspect ratios
+def synthetic_corpus(count, seed=2025):
+    from PIL import Image, ImageDraw
+    from drafter import perceptual_hash, is_near_duplicate
+
+    rng = random.Random(seed)
+    corpus = []
+    hashes = []
+    while len(corpus) < count:
+        size = CORPUS_SIZES[len(corpus) % len(CORPUS_SIZES)]
+        img = Image.new('RGB', size, tuple(rng.randrange(256) for _ in range(3)))
+        draw = ImageDraw.Draw(img)
+        for _ in range(12):
+            x0, y0 = rng.randrange(size[0]), rng.randrange(size[1])
+            x1, y1 = x0 + rng.randrange(size[0] // 2), y0 + rng.randrange(size[1] // 2)
+            shape = draw.ellipse if rng.random() < 0.5 else draw.rectangle
+            shape((x0, y0, x1, y1), fill=tuple(rng.randrange(256) for _ in range(3)))
+        buffer = io.BytesIO()
+        img.save(buffer, format='JPEG', quality=90)
+        data = buffer.getvalue()
+        image_hash = perceptual_hash(data)
+        if is_near_duplicate(image_hash, hashes):
+            continue
+        hashes.append(image_hash)
+        corpus.append((f"{len(corpus):06d}.jpg", data))
+    return corpus
+
+
+def load_corpus(directory):
+    corpus = []
+    for name in sorted(os.listdir(directory)):
+        if name.lower().endswith(('.jpg', '.jpeg', '.png', '.webp')):
+            with open(os.path.join(directory, name), 'rb') as f:
+                corpus.append((name, f.read()))
+    return corpus
+
+
+# Nearest-rank percentile
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round((own + children) / scale, 1)
+
+
+# Pairs the n-th photo handed over for a player with the n-th graphic announced for them
+def image_latencies(player_name, announced):
+    handed_over = sorted(
+        t for keyword, times in FixtureCrawler.write_log.items() if keyword.startswith(player_name) for t in times
+    )
+    return [done - started for started, done in zip(handed_over, announced)]
+
+
+def summarize(first_graphic, latencies, jobs, elapsed):
+    return {
+        'time_to_first_graphic': {
+            'p50': percentile(first_graphic, 50),
+            'max': max(first_graphic) if first_graphic else None,
+        },
+        'image_latency': {
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+            'p99': percentile(latencies, 99),
+            'count': len(latencies),
+        },
+        'jobs': jobs,
+        'elapsed': elapsed,
+        'jobs_per_minute': jobs / elapsed * 60 if elapsed else None,
+    }
+
+
+# Empties the on-disk caches and the in-memory templates, compositors and fitted font sizes, for a cold run
+def clear_caches(cache_root):
+    import drafter
+
+    for name in os.listdir(cache_root):
+        shutil.rmtree(os.path.join(cache_root, name), ignore_errors=True)
+    drafter.filled_template_cache.clear()
+    drafter.compositor_cache.clear()
+    drafter.fit_font_size.cache_clear()
+
+
+def bench_pipeline(players, args, cache_root, output_root):
+    import drafter
+
+    first_graphic, latencies = [], []
+    start = time.time()
+    for run in range(args.runs):
+        for player in players:
+            if not args.warm:
+                clear_caches(cache_root)
+            FixtureCrawler.reset()
+            announced = []
+            job_start = time.time()
+            drafter.run_player_image_pipeline(
+                player['Name'], args.pick, num_samples=args.num_samples,
+                on_image=lambda file, preview: announced.append(time.time()),
+                temp_dir=os.path.join(output_root, 'temp'), output_dir=os.path.join(output_root, 'out'),
+            )
+            if announced:
+                first_graphic.append(announced[0] - job_start)
+            latencies.extend(image_latencies(player['Name'], announced))
+    return summarize(first_graphic, latencies, args.runs * len(players), time.time() - start)
+
+
+def bench_server(players, args, cache_root):
+    import server
+
+    client = server.app.test_client()
+    # Measure a server that reports ready, like one behind a load balancer would be
+    while client.get('/readyz').status_code != 200:
+        time.sleep(0.05)
+    first_graphic, latencies = [], []
+    start = time.time()
+    for run in range(args.runs):
+        if not args.warm:
+            clear_caches(cache_root)
+        FixtureCrawler.reset()
+        watchers = []
+        jobs = []
+        for player in players:
+            submitted = time.time()
+            response = client.post('/generate', data={
+                'player_name': player['Name'], 'pick_number': str(args.pick), 'num_samples': str(args.num_samples),
+            }, headers={'Accept': 'application/json'})
+            job_id = response.get_json()['job_id']
+            announced = []
+
+            # Follow the job's event stream the way the gallery page does
+            def watch(job_id=job_id, announced=announced):
+                stream = client.get(f'/gallery_stream?job={job_id}')
+                for chunk in stream.response:
+                    for line in chunk.decode('utf-8').splitlines() if isinstance(chunk, bytes) else chunk.splitlines():
+                        if line == 'event: image':
+                            announced.append(time.time())
+
+            watcher = threading.Thread(target=watch)
+            watcher.start()
+            watchers.append(watcher)
+            jobs.append((player, job_id, submitted, announced))
+
+        for watcher in watchers:
+            watcher.join()
+        for player, job_id, submitted, announced in jobs:
+            if announced:
+                first_graphic.append(announced[0] - submitted)
+            latencies.extend(image_latencies(player['Name'], announced))
+            job = server.scheduler.get(job_id)
+            if job is not None:
+                server.remove_job_files(job)
+    return summarize(first_graphic, latencies, args.runs * len(players), time.time() - start)
+
+
+# Metrics where a bigger number is worse, and how to read them out of a result
+COMPARED_METRICS = {
+    'time_to_first_graphic.p50': lambda r: r['time_to_first_graphic']['p50'],
+    'image_latency.p50': lambda r: r['image_latency']['p50'],
+    'image_latency.p95': lambda r: r['image_latency']['p95'],
+    'image_latency.p99': lambda r: r['image_latency']['p99'],
+    'minutes_per_job': lambda r: 1 / r['jobs_per_minute'] if r['jobs_per_minute'] else None,
+}
+
+
+# Prints how each metric moved against a baseline; returns the names of those that regressed past tolerance
+def compare(results, baseline, tolerance):
+    regressions = []
+    for mode, result in results['modes'].items():
+        if mode not in baseline.get('modes', {}):
+            continue
+        for name, read in COMPARED_METRICS.items():
+            new, old = read(result), read(baseline['modes'][mode])
+            if new is None or not old:
+                continue
+            change = (new - old) / old
+            flag = ''
+            if change > tolerance:
+                flag = '  <-- regression'
+                regressions.append(f"{mode}.{name}")
+            print(f"{mode:>8} {name:<28} {old:9.3f} -> {new:9.3f} ({change:+.1%}){flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the draft graphics pipeline offline.")
+    parser.add_argument('--mode', choices=('pipeline', 'server', 'all'), default='all')
+    parser.add_argument('--runs', type=int, default=1, help="times to repeat each scenario")
+    parser.add_argument('--jobs', type=int, default=3, help="players rendered per run (top of the board)")
+    parser.add_argument('--num-samples', type=int, default=15)
+    parser.add_argument('--pick', type=int, default=14)
+    parser.add_argument('--latency', type=float, default=0.05, help="seconds each fixture image takes to arrive")
+    parser.add_argument('--corpus', help="directory of real photos to serve instead of the synthetic corpus")
+    parser.add_argument('--corpus-size', type=int, default=48)
+    parser.add_argument('--backend', choices=('thread', 'process'))
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--profile', help="output profile, e.g. png or webp")
+    parser.add_argument('--warm', action='store_true', help="keep caches between runs instead of starting cold")
+    parser.add_argument('--output', help="where to save the JSON results")
+    parser.add_argument('--compare', metavar='BASELINE', help="JSON results of an earlier run to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.10, help="allowed slowdown before flagging a regression")
+    args = parser.parse_args()
+
+    # Settings drafter reads at import time, and caches kept out of the real ones
+    work_root = tempfile.mkdtemp(prefix='drafter-bench-')
+    cache_root = os.path.join(work_root, 'cache')
+    os.makedirs(cache_root)
+    os.environ['DRAFTER_SOURCE_CACHE'] = os.path.join(cache_root, 'sources')
+    os.environ['DRAFTER_PRERENDER_DIR'] = os.path.join(cache_root, 'prerender')
+    os.environ['DRAFTER_OUTPUT_CACHE'] = os.path.join(cache_root, 'outputs')
+    if args.backend:
+        os.environ['DRAFTER_BACKEND'] = args.backend
+    if args.workers:
+        os.environ['DRAFTER_WORKERS'] = str(args.workers)
+    if args.profile:
+        os.environ['DRAFTER_OUTPUT_PROFILE'] = args.profile
+
+    import drafter
+    drafter.GoogleImageCrawler = FixtureCrawler
+    FixtureCrawler.corpus = load_corpus(args.corpus) if args.corpus else synthetic_corpus(args.corpus_size)
+    FixtureCrawler.latency = args.latency
+
+    index = drafter.get_prospect_index(drafter.PROSPECT_DATA_PATH)
+    index.refresh()
+    players = index.players[:args.jobs]
+
+    results = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'config': {
+            'runs': args.runs, 'jobs': args.jobs, 'num_samples': args.num_samples, 'latency': args.latency,
+            'corpus': args.corpus or f"synthetic:{args.corpus_size}", 'backend': drafter.COMPOSITE_BACKEND,
+            'workers': drafter.COMPOSITE_WORKERS or min(8, os.cpu_count() or 4), 'profile': drafter.OUTPUT_PROFILE,
+            'warm': args.warm, 'cpus': os.cpu_count(),
+        },
+        'modes': {},
+    }
+    try:
+        if args.mode in ('pipeline', 'all'):
+            results['modes']['pipeline'] = bench_pipeline(players, args, cache_root, work_root)
+        if args.mode in ('server', 'all'):
+            results['modes']['server'] = bench_server(players, args, cache_root)
+    finally:
+        shutil.rmtree(work_root, ignore_errors=True)
+    results['peak_rss_mb'] = peak_rss_mb()
+
+    output = args.output or os.path.join('bench_results', time.strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(json.dumps(results, indent=2))
+    print(f"Saved benchmark results to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"Regressions past {args.tolerance:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+from PIL import Image
+
+# Width and height of the squares the overlay's partly transparent area is divided into
+COMPOSITE_TILE = 32
+
+# Lookup tables for Image.point: 255 where the overlay is fully opaque, and where it's partly transparent
+_OPAQUE = [255 if v == 255 else 0 for v in range(256)]
+_PARTIAL = [255 if 0 < v < 255 else 0 for v in range(256)]
+
+
+class OverlayCompositor:
+    """
+    Draws one overlay over any number of photos, giving exactly what
+    Image.alpha_composite(photo, overlay) would.
+
+    The overlay's alpha is analyzed once. Where it's fully transparent the
+    photo is left alone. Where it's fully opaque, its pixels are copied in
+    with a single "1"-mode mask. The partly transparent pixels (anti-aliased
+    text and the edges of the design) are grouped into runs of tiles along
+    each row, and only those runs are blended, by pasting the overlay with
+    its own alpha as the mask. Over an opaque photo that paste is
+    bit-for-bit the same as alpha compositing. Photos with transparency of
+    their own fall back to Image.alpha_composite.
+
+    Nothing is changed after construction, so one compositor can be shared
+    by every thread compositing photos for the same overlay.
+    """
+
+    def __init__(self, overlay, tile=COMPOSITE_TILE):
+        self.overlay = overlay
+        self.size = overlay.size
+        alpha = overlay.getchannel('A')
+        self._opaque_mask = alpha.point(_OPAQUE, '1')
+        self._runs = [(box, _solid_tile(overlay, box), alpha.crop(box)) for box in _partial_runs(alpha, tile)]
+
+    # Returns the photo with the overlay drawn on top, as RGBA. Takes over the photo, which must be
+    # overlay-sized RGB or RGBA, and may return it modified in place.
+    def composite(self, photo):
+        if photo.mode == 'RGBA':
+            if photo.getchannel('A').getextrema() != (255, 255):
+                with photo:
+                    return Image.alpha_composite(photo, self.overlay)
+            combined = photo
+        else:
+            with photo:
+                combined = photo.convert('RGBA')
+        # Only pixels where the overlay's alpha is already 255 are copied, so the result stays opaque
+        combined.paste(self.overlay, (0, 0), self._opaque_mask)
+        for box, tile, mask in self._runs:
+            combined.paste(tile, box, mask)
+        return combined
+
+
+# The overlay's pixels in box with their alpha set to 255, for pasting through the original alpha as the mask
+def _solid_tile(overlay, box):
+    tile = overlay.crop(box)
+    tile.putalpha(255)
+    return tile
+
+
+# Boxes covering every partly transparent pixel of alpha: horizontal runs of adjacent tiles that contain one
+def _partial_runs(alpha, tile):
+    partial = alpha.point(_PARTIAL)
+    bbox = partial.getbbox()
+    if bbox is None:
+        return []
+    runs = []
+    for top in range(bbox[1], bbox[3], tile):
+        bottom = min(top + tile, bbox[3])
+        start = None
+        for left in range(bbox[0], bbox[2] + tile, tile):
+            right = min(left + tile, bbox[2])
+            hit = left < bbox[2] and partial.crop((left, top, right, bottom)).getbbox() is not None
+            if hit and start is None:
+                start = left
+            elif not hit and start is not None:
+                runs.append((start, top, min(left, bbox[2]), bottom))
+                start = None
+    return runs
@@ -1,21 +1,93 @@
-from icrawler.builtin import GoogleImageCrawler
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw
 import os
-import csv
-import difflib
-from email.message import EmailMessage
-from email.utils import make_msgid
-from mimetypes import guess_type
+import io
+import functools
+import hashlib
+import math
+import re
+import shutil
+import sys
 import time
+import argparse
 import threading
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
+from prospect_index import get_prospect_index
+from source_cache import get_source_cache, write_atomic
+from prerender import LayerStore, OutputCache, player_slug
+from render_cache import FONT_PATH, RENDER_CACHE_SIZE, LRUCache, load_base_template, load_font
+from metrics import Trace, current_trace, merge_spans, record, run_traced, timed, tracing
+from memory_budget import MemoryBudget, get_memory_budget
+from compositing import OverlayCompositor
+from render_queue import RenderQueue
 
-PROSPECT_DATA_PATH = 'data\cbs_prospect_rankings.csv'
+# Every board merged by scrapers/refresh.py, falling back to the CBS board alone if it hasn't been compiled
+PROSPECT_STORE_PATH = os.path.join('data', 'prospects.json')
+PROSPECT_DATA_PATH = (PROSPECT_STORE_PATH if os.path.exists(PROSPECT_STORE_PATH)
+                      else os.path.join('data', 'cbs_prospect_rankings.csv'))
+
+# Compositing backend, 'thread' or 'process', and pool size (0 picks one from the CPU count)
+COMPOSITE_BACKEND = os.environ.get('DRAFTER_BACKEND', 'thread')
+COMPOSITE_WORKERS = int(os.environ.get('DRAFTER_WORKERS', 0))
+
+# Output encodings by profile name: (PIL format, save options, file extension)
+OUTPUT_PROFILES = {
+    'png': ('PNG', {}, '.png'),
+    'png-fast': ('PNG', {'compress_level': 1}, '.png'),
+    'webp-lossless': ('WEBP', {'lossless': True, 'quality': 0, 'method': 0}, '.webp'),
+    'webp': ('WEBP', {'quality': 90, 'method': 4}, '.webp'),
+    'jpeg': ('JPEG', {'quality': 95, 'subsampling': 0}, '.jpg'),
+    'preview': ('JPEG', {'quality': 80}, '.jpg'),
+}
+OUTPUT_PROFILE = os.environ.get('DRAFTER_OUTPUT_PROFILE', 'png')
+
+# Small renditions shown in the gallery, saved next to each graphic under PREVIEW_DIR
+PREVIEW_PROFILE = 'preview'
+PREVIEW_SIZE = int(os.environ.get('DRAFTER_PREVIEW_SIZE', 360))
+PREVIEW_DIR = 'previews'
+# Progressive runs show a preview-sized composite of each photo first, saved under PREVIEW_DIR with this
+# suffix and deleted once the full render replaces it
+DRAFT_SUFFIX = '.draft'
+# Downloaded bytes a progressive run may hold in photos waiting for their full render. Full renders reserve
+# the shared memory budget only once they start, so drafting is never held up behind them.
+RENDER_QUEUE_BYTES = int(os.environ.get('DRAFTER_RENDER_QUEUE_MB', 64)) * 1024 * 1024
+
+# Source photos are checked from their header before decoding: too small, too elongated,
+# too large or not a photo format and they're dropped
+SOURCE_FORMATS = ('JPEG', 'PNG', 'WEBP')
+MIN_SOURCE_SIZE = int(os.environ.get('DRAFTER_MIN_SOURCE_SIZE', 400))
+MAX_SOURCE_ASPECT = 2.5
+MAX_SOURCE_PIXELS = 50_000_000
+
+# Crawls request this many times the images still needed, to make up for rejects and duplicates
+CRAWL_OVERFETCH = 2
+
+# Threads per crawl (both queries crawl at once, each with its own), and per-image download timeout/retries
+CRAWL_PARSER_THREADS = int(os.environ.get('DRAFTER_CRAWL_PARSER_THREADS', 1))
+CRAWL_DOWNLOADER_THREADS = int(os.environ.get('DRAFTER_CRAWL_DOWNLOADER_THREADS', 4))
+CRAWL_TIMEOUT = float(os.environ.get('DRAFTER_CRAWL_TIMEOUT', 5))
+CRAWL_RETRIES = int(os.environ.get('DRAFTER_CRAWL_RETRIES', 3))
+# Connections kept open per host by the session all crawls share
+CRAWL_POOL_SIZE = 32
+
+# Photos whose perceptual hashes differ in at most this many of 64 bits count as the same photo
+DUPLICATE_HASH_DISTANCE = 6
+
+# Players of a batch rendered at the same time, all sharing one compositing pool
+BATCH_PARALLEL = int(os.environ.get('DRAFTER_BATCH_PARALLEL', 2))
+
+# Pick list lines: "14. Cam Ward", "14 Cam Ward", "Cam Ward, 14" or "Cam Ward 14"
+PICK_FIRST_PATTERN = re.compile(r'^#?(\d+)\s*[.):,-]?\s+(.+)$')
+PICK_LAST_PATTERN = re.compile(r'^(.+?)\s*[,:-]?\s+#?(\d+)$')
+
+# Default working and output directories; jobs run by the server get their own subdirectories
+TEMP_DIR = './temp_images'
+OUTPUT_DIR = './final_graphics'
 
 # Clear any existing images in the directory
-def clear_temp_images():
-    for file in os.listdir('./temp_images'):
-        file_path = os.path.join('./temp_images', file)
+def clear_temp_images(temp_dir=TEMP_DIR):
+    os.makedirs(temp_dir, exist_ok=True)
+    for file in os.listdir(temp_dir):
+        file_path = os.path.join(temp_dir, file)
         try:
             if os.path.isfile(file_path):
                 os.unlink(file_path)
@@ -23,48 +95,162 @@ def clear_temp_images():
             print(f"Error while deleting file {file_path}: {e}")
 
 
-def clear_final_images():
-    for file in os.listdir('./final_graphics'):
+def clear_final_images(output_dir=OUTPUT_DIR):
+    os.makedirs(output_dir, exist_ok=True)
+    for file in os.listdir(output_dir):
         # Skip image_server.py and any other .py files
         if file.endswith('.py'):
             continue
-        file_path = os.path.join('./final_graphics', file)
+        file_path = os.path.join(output_dir, file)
         try:
             if os.path.isfile(file_path):
                 os.unlink(file_path)
+            elif file == PREVIEW_DIR:
+                shutil.rmtree(file_path)
         except Exception as e:
             print(f"Error while deleting file {file_path}: {e}")
 
 
+# icrawler (with requests) is most of this module's import time, so it and image_feed, which builds on it,
+# are imported on first use instead; warm_up loads them ahead of the first pick.
+GoogleImageCrawler = None
+
+
+def crawler_class():
+    global GoogleImageCrawler
+    if GoogleImageCrawler is None:
+        from icrawler.builtin import GoogleImageCrawler as crawler_cls
+        GoogleImageCrawler = crawler_cls
+    return GoogleImageCrawler
+
+
+# One HTTP session, with a connection pool, shared by every crawl so connections are reused across queries and jobs
+_crawl_session = None
+_crawl_session_lock = threading.Lock()
+
+
+# Returns a GoogleImageCrawler on the shared session, with the configured threads and timeouts
+def make_crawler(storage):
+    global _crawl_session
+    from requests.adapters import HTTPAdapter
+    from image_feed import FeedDownloader
+
+    crawler = crawler_class()(
+        downloader_cls=FeedDownloader, storage=storage, parser_threads=CRAWL_PARSER_THREADS,
+        downloader_threads=CRAWL_DOWNLOADER_THREADS,
+        extra_downloader_args={'request_timeout': CRAWL_TIMEOUT, 'max_retry': CRAWL_RETRIES},
+    )
+    with _crawl_session_lock:
+        if _crawl_session is None:
+            # Keep the first crawler's session, which carries icrawler's default headers
+            _crawl_session = crawler.session
+            adapter = HTTPAdapter(pool_connections=CRAWL_POOL_SIZE, pool_maxsize=CRAWL_POOL_SIZE)
+            _crawl_session.mount('http://', adapter)
+            _crawl_session.mount('https://', adapter)
+    for component in (crawler, crawler.feeder, crawler.parser, crawler.downloader):
+        component.session = _crawl_session
+    return crawler
+
+
 # Download the images
-def fetch_images(player_data, num_samples=15):
-    import glob
+# When a feed is given, each finished download is handed to it in memory instead of written to temp_dir,
+# and crawling continues until the feed's consumer has accepted num_samples distinct images.
+# Photos already in the source cache are fed first, and new downloads are added to it.
+def fetch_images(player_data, num_samples=15, feed=None, temp_dir=TEMP_DIR, cache=None):
     name = player_data["Name"]
     school = player_data["School"]
     search_query = f"{name} {school}"
 
-    if not os.path.exists('./temp_images'):
-        os.makedirs('./temp_images')
+    if feed is None:
+        if not os.path.exists(temp_dir):
+            os.makedirs(temp_dir)
+        storage = {'root_dir': temp_dir}
+
+        # First crawl: name + school (up to num_samples)
+        google_crawler = make_crawler(storage)
+        google_crawler.crawl(keyword=search_query, max_num=num_samples, filters=None)
+
+        # Count images downloaded
+        num_downloaded = google_crawler.downloader.fetched_num
+
+        # If fewer than num_samples, try to fetch the rest with just the name
+        if num_downloaded < num_samples:
+            remaining = num_samples - num_downloaded
+            google_crawler2 = make_crawler(storage)
+            google_crawler2.crawl(keyword=name, max_num=remaining, filters=None, file_idx_offset='auto')
+        return
 
-    # First crawl: name + school (up to num_samples)
-    google_crawler = GoogleImageCrawler(storage={'root_dir': './temp_images'})
-    google_crawler.downloader_threads = 4
-    google_crawler.crawl(keyword=search_query, max_num=num_samples, filters=None)
+    from image_feed import FeedStorage
 
-    # Count images downloaded
-    image_files = [f for f in os.listdir('./temp_images') if f.lower().endswith(('.jpg', '.jpeg', '.png', '.webp', '.gif'))]
-    num_downloaded = len(image_files)
+    queries = (search_query, name)
+    cache = cache or get_source_cache()
 
-    # If fewer than num_samples, try to fetch the rest with just the name
-    if num_downloaded < num_samples:
-        remaining = num_samples - num_downloaded
-        google_crawler2 = GoogleImageCrawler(storage={'root_dir': './temp_images'})
-        google_crawler2.crawl(keyword=name, max_num=remaining, filters=None)
+    # A prefetched player starts rendering straight from the cache, with no network wait.
+    # The photos the player's last run used come first, in the same order, so resubmitting a pick accepts the
+    # same photos under the same names and every one is an output cache hit.
+    # Photos are read one at a time as the feed takes them, so only the feed's queue is ever in memory.
+    cached_digests = set()
+    sources = [cache.get_selection(selection_key(player_data), skip=cached_digests)]
+    sources += [cache.get(query, skip=cached_digests) for query in queries]
+    for cached in sources:
+        while True:
+            with timed('cache_read'):
+                image = next(cached, None)
+            if image is None:
+                break
+            digest, data = image
+            cached_digests.add(digest)
+            if not feed.put(f"cache:{digest[:12]}", data):
+                return
+
+    feed.wait_idle()
+    remaining = num_samples - feed.accepted
+    if remaining > 0 and not feed.stopped.is_set():
+        # Name + school and just the name crawl at the same time, so a slow query doesn't hold up the job.
+        # Some downloads get rejected or turn out to be duplicates, so each crawl asks for more than it needs.
+        trace = current_trace()
+        crawls = []
+        screen = cache_screen()
+        for query in queries:
+            crawler = make_crawler(FeedStorage(feed, cache, query, screen))
+            thread = threading.Thread(
+                target=run_traced, args=(trace, crawl_query, crawler, query, remaining * CRAWL_OVERFETCH), daemon=True
+            )
+            thread.start()
+            crawls.append((crawler, thread))
+        for crawler, thread in crawls:
+            while thread.is_alive() and not feed.stopped.is_set():
+                thread.join(0.1)
+        if feed.stopped.is_set():
+            # The consumer has enough; tell the crawls to wind down rather than waiting for them
+            for crawler, thread in crawls:
+                crawler.signal.set(reach_max_num=True)
+    cache.evict()
+
+
+# Source cache key of the photos a player's last run used; the pick doesn't change which photos are found
+def selection_key(player_data):
+    return f"{player_data['Name']} {player_data['School']}"
+
+
+def crawl_query(crawler, query, max_num):
+    with timed('crawl', query=query):
+        crawler.crawl(keyword=query, max_num=max_num, filters=None)
 
 
 # Async wrapper for fetch_images
-def async_fetch_images(player_data, num_samples=15):
-    thread = threading.Thread(target=fetch_images, args=(player_data, num_samples))
+# Closes the feed once crawling is over so the consumer knows no more images are coming
+def async_fetch_images(player_data, num_samples=15, feed=None):
+    trace = current_trace()
+
+    def run():
+        try:
+            run_traced(trace, fetch_images, player_data, num_samples, feed)
+        finally:
+            if feed is not None:
+                feed.close()
+
+    thread = threading.Thread(target=run)
     thread.start()
     return thread
 
@@ -100,32 +286,59 @@ def get_round_and_pick(overall_pick):
     return "Pick number out of range"
 
 
+# Largest size on the max_font_size, max_font_size - 2, ... ladder at which text fits in max_width.
+# Text width grows with font size, so the ladder is binary-searched instead of walked, and results are
+# memoized per string, which makes laying out a whole board of names cheap.
+@functools.lru_cache(maxsize=4096)
+def fit_font_size(text, max_width, font_path, max_font_size, min_font_size=40, stroke_width=2):
+    draw = ImageDraw.Draw(Image.new("RGBA", (1, 1)))
+
+    def fits(font_size):
+        bbox = draw.textbbox((0, 0), text, font=load_font(font_path, font_size), stroke_width=stroke_width)
+        return bbox[2] - bbox[0] <= max_width
+
+    sizes = range(max_font_size, min_font_size - 1, -2)
+    # Most names fit at full size, so check that before searching
+    if sizes and fits(sizes[0]):
+        return sizes[0]
+    low, high = 1, len(sizes)
+    while low < high:
+        middle = (low + high) // 2
+        if fits(sizes[middle]):
+            high = middle
+        else:
+            low = middle + 1
+    return sizes[low] if low < len(sizes) else min_font_size
+
+
 def fit_text(draw, text, max_width, font_path, max_font_size, min_font_size=40, stroke_width=2):
-    font_size = max_font_size
-    while font_size >= min_font_size:
-        font = ImageFont.truetype(font_path, size=font_size)
-        bbox = draw.textbbox((0, 0), text, font=font, stroke_width=stroke_width)
-        text_width = bbox[2] - bbox[0]
-        if text_width <= max_width:
-            return font
-        font_size -= 2
-    return ImageFont.truetype(font_path, size=min_font_size)
-
-
-# Adds the text to the template image
-def add_text_to_template(player_data):
+    return load_font(font_path, fit_font_size(text, max_width, font_path, max_font_size, min_font_size, stroke_width))
+
+
+# Cached font objects are shared, and FreeType faces aren't safe to draw with from two threads at once
+_text_render_lock = threading.RLock()
+
+
+# Compositing processes render templates themselves, and fork copies this lock in whatever state
+# another thread left it, so each forked worker starts with a fresh one
+def _reset_text_render_lock():
+    global _text_render_lock
+    _text_render_lock = threading.RLock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_text_render_lock)
+
+
+# Draws the player's name on a copy of the template.
+# Returns the image and the (x, y) where the pick row goes underneath the name.
+def add_name_to_template(player_data):
     player_name = player_data["Name"].lower()
-    player_position = player_data["Position"]
-    player_school = player_data["School"]
-    player_pick = player_data["Pick"]
-    player_round_and_pick_string = get_round_and_pick(player_pick)
 
-    font_path = "assets/evogria.otf"
+    font_path = FONT_PATH
     max_name_font_size = 120
-    bottom_row_font_size = 36
 
-    file_path = "assets/draft_template.png"
-    img = Image.open(file_path).convert("RGBA")
+    img = load_base_template().copy()
     draw = ImageDraw.Draw(img)
     width, height = img.size
 
@@ -136,136 +349,834 @@ def add_text_to_template(player_data):
     start_x = int(width * 0.27)
     max_text_width = int(width * 0.66)  # from start_x to right edge (adjustable)
 
-    # Fit name text
-    top_row_font = fit_text(
-        draw, player_name, max_text_width, font_path, max_name_font_size
-    )
+    with _text_render_lock:
+        # Fit name text
+        top_row_font = fit_text(
+            draw, player_name, max_text_width, font_path, max_name_font_size
+        )
+
+        # Y position for name text
+        name_bbox = draw.textbbox((0, 0), player_name, font=top_row_font, stroke_width=2)
+        text_height = name_bbox[3] - name_bbox[1]
+        y = text_box_top + (text_box_height - text_height) / 2
+
+        # Draw name text
+        draw.text((start_x, y), player_name, font=top_row_font, fill="white", stroke_width=2, stroke_fill="black")
 
-    # Y position for name text
-    name_bbox = draw.textbbox((0, 0), player_name, font=top_row_font, stroke_width=2)
-    text_height = name_bbox[3] - name_bbox[1]
-    y = text_box_top + (text_box_height - text_height) / 2
+    return img, (start_x, y + top_row_font.size + 16)
 
-    # Draw name text
-    draw.text((start_x, y), player_name, font=top_row_font, fill="white", stroke_width=2, stroke_fill="black")
+
+# Draws the "round X pick Y, position, school" row at the given position.
+# This is the only pick-dependent part of a graphic, and the template under it is opaque,
+# so it can be drawn on a finished composite as well as on the overlay.
+def add_pick_row(img, player_data, position):
+    player_round_and_pick_string = get_round_and_pick(player_data["Pick"])
+    bottom_row_font_size = 36
 
     # Bottom row metadata
-    metadata_row = f"{player_round_and_pick_string}, {player_position}, {player_school}".lower()
-    bottom_row_font = ImageFont.truetype(font_path, size=bottom_row_font_size)
-    draw.text((start_x, y + top_row_font.size + 16), metadata_row, font=bottom_row_font, fill="white", stroke_width=2, stroke_fill="black")
+    metadata_row = f"{player_round_and_pick_string}, {player_data['Position']}, {player_data['School']}".lower()
+    draw = ImageDraw.Draw(img)
+    with _text_render_lock:
+        bottom_row_font = load_font(FONT_PATH, bottom_row_font_size)
+        draw.text(position, metadata_row, font=bottom_row_font, fill="white", stroke_width=2, stroke_fill="black")
+
+
+# Adds the text to a copy of the template image and returns it
+def add_text_to_template(player_data):
+    with timed('text'):
+        img, pick_row_position = add_name_to_template(player_data)
+        add_pick_row(img, player_data, pick_row_position)
+    print(f"Rendered template with fixed-x name and metadata for {player_data['Name']}")
+    return img
+
+
+# Filled overlays kept in memory, so re-running a pick skips text layout and drawing
+filled_template_cache = LRUCache(RENDER_CACHE_SIZE)
+
 
-    # Save output
-    new_filename = 'draft_template_filled.png'
-    new_path = os.path.join('./temp_images', new_filename)
-    img.save(new_path)
-    print(f"Saved with fixed-x name and metadata: {new_filename}")
+# Returns the filled overlay for this player and pick, from the cache when possible.
+# The returned image is shared, so callers must not draw on it.
+def get_filled_template(player_data):
+    return filled_template_cache.get_or_create(template_key(player_data), lambda: add_text_to_template(player_data))
+
+
+# Filled overlays analyzed for compositing, one per player and pick like filled_template_cache
+compositor_cache = LRUCache(RENDER_CACHE_SIZE)
+
+
+# Returns the compositor that draws this player and pick's filled overlay over photos, built once per overlay
+def get_compositor(player_data):
+    return compositor_cache.get_or_create(
+        template_key(player_data), lambda: OverlayCompositor(get_filled_template(player_data))
+    )
+
+
+# Returns the compositor for this player and pick's filled overlay scaled to fit in a preview, for drafts
+def get_draft_compositor(player_data, size=PREVIEW_SIZE):
+    def build():
+        template = get_filled_template(player_data)
+        scale = size / max(template.size)
+        scaled_size = (max(1, round(template.width * scale)), max(1, round(template.height * scale)))
+        return OverlayCompositor(template.resize(scaled_size, Image.LANCZOS))
+
+    return compositor_cache.get_or_create(template_key(player_data) + (size,), build)
+
+
+def template_key(player_data):
+    return (player_data["Name"], player_data["Position"], player_data["School"], player_data["Pick"])
 
 
 # Returns the player data based on the provided name
-# Allows for typos by using difflib, so that we can type quickly.
+# Allows for typos by fuzzy matching against the cached prospect index, so that we can type quickly.
 def find_closest_player(name, csv_path=PROSPECT_DATA_PATH):
-    with open(csv_path, newline='', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        players = list(reader)
-        names = [player['Name'] for player in players]
-        
-        # Find the closest match
-        closest_match = difflib.get_close_matches(name, names, n=1, cutoff=0.7)
-        if closest_match:
-            for player in players:
-                if player['Name'] == closest_match[0]:
-                    print(f"Found closest player: {player}")
-                    return player
+    player = get_prospect_index(csv_path).best_match(name, cutoff=0.7)
+    if player is None:
+        return None
+    print(f"Found closest player: {player}")
+    # Callers add per-run fields like "Pick", so never hand out the indexed row itself
+    return dict(player)
+
+
+# Returns up to k (player, score) pairs for the given name, best match first
+def find_closest_players(name, k=5, csv_path=PROSPECT_DATA_PATH):
+    return [(dict(player), score) for player, score in get_prospect_index(csv_path).search(name, k=k)]
+
+
+# Returns why a downloaded photo isn't worth compositing, or None if it is.
+# Only the image header is read, so rejected photos are never decoded.
+def source_image_problem(data):
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            image_format = img.format
+            width, height = img.size
+    except Exception as e:
+        return f"unreadable ({e})"
+    if image_format not in SOURCE_FORMATS:
+        return f"unsupported format {image_format}"
+    if min(width, height) < MIN_SOURCE_SIZE:
+        return f"too small ({width}x{height})"
+    if max(width, height) / min(width, height) > MAX_SOURCE_ASPECT:
+        return f"wrong aspect ratio ({width}x{height})"
+    if width * height > MAX_SOURCE_PIXELS:
+        return f"too large ({width}x{height})"
+    return None
+
+
+# 64-bit difference hash (dHash) of a photo, computed on a 9x8 grayscale thumbnail.
+# The same photo at different sizes or compression levels hashes to (nearly) the same value.
+def perceptual_hash(data):
+    with Image.open(io.BytesIO(data)) as img:
+        img.draft('L', (64, 64))
+        pixels = list(img.convert('L').resize((9, 8), Image.BILINEAR).getdata())
+    image_hash = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            image_hash = (image_hash << 1) | (left > right)
+    return image_hash
+
+
+def is_near_duplicate(image_hash, seen_hashes, max_distance=DUPLICATE_HASH_DISTANCE):
+    return any(bin(image_hash ^ seen).count('1') <= max_distance for seen in seen_hashes)
+
+
+# Returns a check for downloads about to go in the source cache, giving why a photo isn't usable or None.
+# Photos generate_samples would reject, or near-duplicates of one already passed (or of those in seed), are
+# left out, so a query's cached count is the number of photos a run can actually use.
+# The check is shared by a crawl's downloader threads.
+def cache_screen(seed=()):
+    seen_hashes = [perceptual_hash(data) for data in seed]
+    lock = threading.Lock()
+
+    def screen(data):
+        problem = source_image_problem(data)
+        if problem:
+            return problem
+        image_hash = perceptual_hash(data)
+        with lock:
+            if is_near_duplicate(image_hash, seen_hashes):
+                return "near-duplicate of an earlier photo"
+            seen_hashes.append(image_hash)
+        return None
+
+    return screen
+
+
+# Encodes img to path through a temporary file, so readers never see a half-written graphic
+def save_image(img, path, profile):
+    image_format, options, _ = OUTPUT_PROFILES[profile]
+    if image_format == 'JPEG' and img.mode != 'RGB':
+        img = img.convert('RGB')
+    # Encoded in memory first, so encoding and disk time are measured separately
+    buffer = io.BytesIO()
+    with timed('encode', format=image_format):
+        img.save(buffer, format=image_format, **options)
+    with timed('write'):
+        write_atomic(path, buffer.getbuffer())
+
+
+# Rough sharpness of a source photo, for putting the best full renders first: the side its square crop is cut to
+def source_quality(data):
+    with Image.open(io.BytesIO(data)) as img:
+        return min(img.size)
+
+
+# Decodes a downloaded photo and crops/resizes it to cover the template, as RGB, or RGBA if it has transparency.
+# Each intermediate is closed as soon as the next exists, so at most two are alive at once.
+def crop_to_template(data, size):
+    with Image.open(io.BytesIO(data)) as img:
+        width, height = img.size
+
+        # Let JPEGs decode at the smallest power-of-two scale that still covers the template,
+        # instead of decoding 3000+ px photos at full size just to shrink them
+        scale = min(width, height) / size[0]
+        if scale > 1:
+            img.draft('RGB', (math.ceil(width / scale), math.ceil(height / scale)))
+            width, height = img.size
+
+        # Square crop logic
+        new_size = min(width, height)
+        left = (width - new_size) / 2
+        top = 0
+        right = left + new_size
+        bottom = top + new_size
+        cropped_img = img.crop((left, top, right, bottom))
+
+    # Resize to match template dimensions
+    with cropped_img:
+        resized = cropped_img.resize(size, reducing_gap=3.0)
+    if resized.mode in ("RGB", "RGBA"):
+        return resized
+    with resized:
+        return resized.convert("RGBA")
+
+
+# Saves a finished graphic as output_dir/<stem> in the given profile, plus a small preview rendition
+# under output_dir/previews. Returns (filename, preview_filename) relative to output_dir.
+def save_outputs(combined, output_dir, stem, profile, preview_size):
+    output_filename = stem + OUTPUT_PROFILES[profile][2]
+    output_path = os.path.join(output_dir, output_filename)
+    save_image(combined, output_path, profile)
+
+    with timed('preview'):
+        preview = combined.convert('RGB')
+        preview.thumbnail((preview_size, preview_size), reducing_gap=2.0)
+    preview_filename = f"{PREVIEW_DIR}/{stem}{OUTPUT_PROFILES[PREVIEW_PROFILE][2]}"
+    with preview:
+        save_image(preview, os.path.join(output_dir, preview_filename), PREVIEW_PROFILE)
+
+    print(f"Processed and saved: {output_path}")
+    return output_filename, preview_filename
+
+
+# Composites one downloaded photo under the filled template (an OverlayCompositor) and saves it with save_outputs.
+# Returns (filename, preview_filename) relative to output_dir, or None if the photo couldn't be processed.
+def process_image(file, data, compositor, output_dir, stem, profile=None, preview_size=None):
+    try:
+        with timed('decode'):
+            cropped_img = crop_to_template(data, compositor.size)
+
+        # The compositor takes over the photo and draws the template onto it
+        with timed('composite'):
+            combined = compositor.composite(cropped_img)
+
+        with combined:
+            return save_outputs(combined, output_dir, stem, profile or OUTPUT_PROFILE, preview_size or PREVIEW_SIZE)
+    except Exception as e:
+        print(f"Error processing image {file}: {e}")
+        return None
+
+
+# Composites one photo at preview size under the scaled-down template, for the first pass of a progressive run.
+# Returns the draft's filename relative to output_dir, or None if the photo couldn't be processed.
+def render_draft(file, data, compositor, output_dir, stem):
+    try:
+        with timed('draft'):
+            with compositor.composite(crop_to_template(data, compositor.size)) as combined:
+                draft = combined.convert('RGB')
+        draft_filename = f"{PREVIEW_DIR}/{stem}{DRAFT_SUFFIX}{OUTPUT_PROFILES[PREVIEW_PROFILE][2]}"
+        with draft:
+            save_image(draft, os.path.join(output_dir, draft_filename), PREVIEW_PROFILE)
+        return draft_filename
+    except Exception as e:
+        print(f"Error drafting image {file}: {e}")
+        return None
+
+
+# Finishes a pre-rendered photo + name layer by drawing only the pick row, then saves it like process_image
+def finish_prerendered(file, layer_path, player_data, pick_row_position, output_dir, stem,
+                       profile=None, preview_size=None):
+    try:
+        with timed('layer_load'), Image.open(layer_path) as layer:
+            combined = layer.convert("RGBA")
+        with combined:
+            with timed('text'):
+                add_pick_row(combined, player_data, pick_row_position)
+            return save_outputs(combined, output_dir, stem, profile or OUTPUT_PROFILE, preview_size or PREVIEW_SIZE)
+    except Exception as e:
+        print(f"Error finishing pre-rendered image {file}: {e}")
+        return None
+
+
+# Estimated peak memory of one composite beyond its source bytes, counted in template-sized RGBA images:
+# the decoded photo, the cropped photo, the composite and its encoded copy
+COMPOSITE_WORKING_IMAGES = 4
+
+
+# Bytes a composite reserves from the memory budget while it's queued or running
+def composite_cost(data, template):
+    return len(data) + COMPOSITE_WORKING_IMAGES * template.width * template.height * 4
+
+
+# Compositing processes start with one player's filled template already in their cache;
+# templates for any other player are rendered in the worker on first use
+def _init_composite_worker(key, mode, size, pixels):
+    filled_template_cache.put(key, Image.frombytes(mode, size, pixels))
+
+
+def _process_image_in_worker(file, data, player_data, *args):
+    return process_image(file, data, get_compositor(player_data), *args)
+
+
+# Returns fn's result and the stages it timed, which the parent merges into its own trace
+def _run_traced_in_worker(fn, *args):
+    trace = Trace()
+    with tracing(trace):
+        result = fn(*args)
+    return result, trace.spans()
+
+
+# Submits fn(*args) to a compositing pool with its stages timed against trace.
+# Worker processes can't share the trace, so their timings come back with the result and are merged here.
+def submit_traced(executor, trace, fn, *args):
+    if not isinstance(executor, ProcessPoolExecutor):
+        return executor.submit(run_traced, trace, fn, *args)
+    future = Future()
+
+    def relay(worker_future):
+        try:
+            result, spans = worker_future.result()
+        except BaseException as e:
+            future.set_exception(e)
+            return
+        merge_spans(trace, spans)
+        future.set_result(result)
+
+    executor.submit(_run_traced_in_worker, fn, *args).add_done_callback(relay)
+    return future
+
+
+class CompositePool:
+    """
+    Thread or process pool that composites photos, for one player or a whole batch.
+
+    Threads use the compositor they're handed. Processes get the seed
+    player's template once at startup and render and analyze any other
+    player's in the worker, so photos only send back output filenames and
+    their timings.
+    Work is timed against the trace of the thread that submits it.
+    """
+
+    def __init__(self, backend=None, max_workers=None, seed=None):
+        backend = backend or COMPOSITE_BACKEND
+        max_workers = max_workers or COMPOSITE_WORKERS or min(8, os.cpu_count() or 4)
+        if backend == 'process':
+            initargs = ()
+            if seed is not None:
+                player_data, template = seed
+                initargs = (template_key(player_data), template.mode, template.size, template.tobytes())
+            self.executor = ProcessPoolExecutor(
+                max_workers=max_workers, initializer=_init_composite_worker if seed else None, initargs=initargs,
+            )
+        elif backend == 'thread':
+            self.executor = ThreadPoolExecutor(max_workers=max_workers)
         else:
-            return None
+            raise ValueError(f"Unknown compositing backend: {backend}")
+        self.backend = backend
+        self.max_workers = max_workers
 
+    def submit(self, fn, *args):
+        return submit_traced(self.executor, current_trace(), fn, *args)
 
-def generate_samples(player_data, num_samples=15):
-    start = time.time()
-    fetch_thread = async_fetch_images(player_data, num_samples)
-    add_text_to_template(player_data)  # Creates the filled template once
+    # Queues one photo to be composited under player_data's filled template and saved like process_image
+    def submit_photo(self, file, data, player_data, compositor, output_dir, stem, profile):
+        if self.backend == 'process':
+            return self.submit(_process_image_in_worker, file, data, player_data, output_dir, stem, profile)
+        return self.submit(process_image, file, data, compositor, output_dir, stem, profile)
 
-    template_path = './temp_images/draft_template_filled.png'
-    if not os.path.exists(template_path):
-        print("Template overlay image not found!")
-        return
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
+
+
+# on_image, if given, is called with (filename, preview_filename) as soon as each graphic is saved.
+# pool, if given, is a CompositePool shared with other runs (see run_batch); otherwise one is made for this run.
+# With progressive, every accepted photo is first composited at preview size and reported to
+# on_draft(filename, draft_filename), where filename is what the full render will be saved as. Full renders
+# follow, best source photo first, and renders (a RenderQueue) lets the caller move one to the front.
+# Returns how many graphics were saved.
+def generate_samples(player_data, num_samples=15, on_image=None, output_dir=OUTPUT_DIR,
+                     backend=None, max_workers=None, profile=None, pool=None,
+                     progressive=False, on_draft=None, renders=None, on_draft_failed=None):
+    from image_feed import ImageFeed
+
+    start = time.time()
+    profile = profile or OUTPUT_PROFILE
+    if profile not in OUTPUT_PROFILES:
+        raise ValueError(f"Unknown output profile: {profile}")
+    feed = ImageFeed()
+    fetch_thread = async_fetch_images(player_data, num_samples, feed)
+    try:
+        compositor = get_compositor(player_data)  # Creates and analyzes the filled template once
+        template = compositor.overlay
+    except Exception as e:
+        print(f"Could not render template overlay: {e}")
+        feed.stop()
+        return 0
 
     player_name = player_data["Name"].lower().replace(" ", "_")
     img_count = 1
-    processed_files = set()
-    max_workers = min(8, os.cpu_count() or 4)  # Use up to 8 threads, or CPU count
-    executor = ThreadPoolExecutor(max_workers=max_workers)
-    futures = []
+    own_pool = pool is None
+    if own_pool:
+        pool = CompositePool(backend, max_workers, seed=(player_data, template))
+    try:
+        futures = []
+        saved = []
 
-    def process_image(file, img_count):
-        try:
-            file_path = os.path.join('./temp_images', file)
-            img = Image.open(file_path)
-            width, height = img.size
+        os.makedirs(os.path.join(output_dir, PREVIEW_DIR), exist_ok=True)
 
-            # Square crop logic
-            new_size = min(width, height)
-            left = (width - new_size) / 2
-            top = 0
-            right = left + new_size
-            bottom = top + new_size
-            cropped_img = img.crop((left, top, right, bottom))
+        output_cache = OutputCache()
+        layers = LayerStore()
+        pick_row_position = layers.load_layout(player_data["Name"])
+        extensions = (OUTPUT_PROFILES[profile][2], OUTPUT_PROFILES[PREVIEW_PROFILE][2])
 
-            # Resize to match template dimensions
-            template = Image.open(template_path).convert("RGBA")
-            cropped_img = cropped_img.resize(template.size).convert("RGBA")
+        trace = current_trace()
+        # Shared with every other job: while it's spent, this loop stops taking photos off the feed,
+        # which holds the crawler back, so memory stays bounded however many samples are asked for
+        budget = get_memory_budget()
 
-            # Composite
-            combined = Image.alpha_composite(cropped_img, template)
+        # Drafts still showing, by the filename of their full render, which deletes them when it's reported
+        drafts = {}
 
-            # Save final with player name and index
-            output_filename = f"{player_name}_{img_count}.png"
-            output_path = os.path.join('./final_graphics', output_filename)
+        # A draft whose full render failed or was never started: it's deleted and on_draft_failed is told,
+        # so the draft doesn't stay up as a graphic that isn't there
+        def drop_draft(filename):
+            draft = drafts.pop(filename, None)
+            if draft is None:
+                return
+            try:
+                os.unlink(os.path.join(output_dir, draft))
+            except OSError:
+                pass
+            if on_draft_failed:
+                on_draft_failed(filename)
 
-            # --- Save as temporary file first ---
-            temp_output_path = output_path + '.tmp'
-            combined.save(temp_output_path, format='PNG')
+        # Runs as each graphic finishes. reported resolves once on_image has been called, since
+        # future.result() can return before done-callbacks like this one have run.
+        def report(future, filename, output_key, reported, cost, slot):
+            budget.release(cost)
+            if slot:
+                slots.release()
+            try:
+                result = future.result()
+                if result:
+                    saved.append(result)
+                    if on_image:
+                        on_image(*result)
+                    draft = drafts.pop(result[0], None)
+                    if draft:
+                        try:
+                            os.unlink(os.path.join(output_dir, draft))
+                        except OSError:
+                            pass
+                    # Only after the graphic is announced, which a slow or failing cache mustn't hold up
+                    with tracing(trace), timed('cache_store'):
+                        output_cache.store(output_key, output_dir, result)
+                else:
+                    drop_draft(filename)
+            except BaseException as e:
+                try:
+                    drop_draft(filename)
+                finally:
+                    reported.set_exception(e)
+            else:
+                reported.set_result(None)
 
-            # --- After save finishes, rename ---
-            os.rename(temp_output_path, output_path)
+        # Queues the full render of one photo, once the memory budget has room for it
+        def submit_render(file, data, stem, digest, output_key, slot=False):
+            cost = composite_cost(data, template)
+            with timed('budget_wait'):
+                budget.acquire(cost)
+            try:
+                if pick_row_position and layers.has(player_data["Name"], digest):
+                    # Photo and name were composited ahead of time; only the pick row is left to draw
+                    future = pool.submit(
+                        finish_prerendered, file, layers.layer_path(player_data["Name"], digest), player_data,
+                        pick_row_position, output_dir, stem, profile,
+                    )
+                else:
+                    future = pool.submit_photo(file, data, player_data, compositor, output_dir, stem, profile)
+            except BaseException:
+                budget.release(cost)
+                raise
+            reported = Future()
+            future.add_done_callback(
+                lambda f, filename=stem + extensions[0], key=output_key, reported=reported, cost=cost:
+                report(f, filename, key, reported, cost, slot)
+            )
+            futures.append(reported)
 
-            print(f"Processed and saved: {output_path}")
-        except Exception as e:
-            print(f"Error processing image {file}: {e}")
-
-    # Loop while fetch_thread is alive or there are unprocessed images
-    while fetch_thread.is_alive() or True:
-        files = [f for f in os.listdir('./temp_images') if f.lower().endswith(('.png', '.jpg', '.jpeg')) and not f.startswith("draft_template_filled")]
-        new_files = [f for f in files if f not in processed_files]
-        if not new_files and not fetch_thread.is_alive():
-            break
-        for file in new_files:
-            futures.append(executor.submit(process_image, file, img_count))
+        if progressive:
+            renders = renders if renders is not None else RenderQueue()
+            # Full renders start only as the pool has room, so the order of the ones still queued can
+            # change until then. Until they start they hold just their downloaded bytes, capped by queued_bytes;
+            # the shared memory budget is reserved by the dispatcher, so drafting never waits on full renders.
+            slots = threading.Semaphore(pool.max_workers)
+            queued_bytes = MemoryBudget(RENDER_QUEUE_BYTES)
+
+            def dispatch():
+                while True:
+                    slots.acquire()
+                    item = renders.pop()
+                    if item is None:
+                        slots.release()
+                        return
+                    queued_bytes.release(len(item[1]))
+                    try:
+                        submit_render(*item, slot=True)
+                    except BaseException:
+                        slots.release()
+                        raise
+
+            dispatcher = threading.Thread(target=run_traced, args=(trace, dispatch), name='render-dispatch', daemon=True)
+            dispatcher.start()
+
+        seen_hashes = []
+        # Digests of the photos this run used, in order, replayed first the next time this player is run
+        accepted_digests = []
+
+        # Each download arrives here as soon as it finishes, fully in memory
+        waiting_since = time.perf_counter()
+        for file, data in feed:
+            # Time spent with nothing to composite, waiting on the crawl
+            record('feed_wait', time.perf_counter() - waiting_since)
+            with timed('screen'):
+                problem = source_image_problem(data)
+                if not problem:
+                    try:
+                        image_hash = perceptual_hash(data)
+                    except Exception as e:
+                        problem = f"unreadable ({e})"
+                    else:
+                        if is_near_duplicate(image_hash, seen_hashes):
+                            problem = "near-duplicate of an earlier photo"
+            if problem:
+                print(f"Skipping image {file}: {problem}")
+                feed.task_done(False)
+                waiting_since = time.perf_counter()
+                continue
+            seen_hashes.append(image_hash)
+            # Save final with player name and index
+            stem = f"{player_name}_{img_count}"
             img_count += 1
-            processed_files.add(file)
-        # Remove completed futures
-        futures = [f for f in futures if not f.done()]
-        time.sleep(0.05)  # Much tighter loop for responsiveness
-    # Wait for all processing to finish
-    for f in futures:
-        f.result()
+            digest = hashlib.sha256(data).hexdigest()
+            accepted_digests.append(digest)
+            output_key = OutputCache.key(player_data, digest, profile, PREVIEW_SIZE)
+
+            # Same player, pick and photo as an earlier render: reuse the finished files
+            with timed('cache_restore'):
+                restored = output_cache.restore(output_key, output_dir, stem, extensions, PREVIEW_DIR)
+            if restored:
+                print(f"Reused cached render: {restored[0]}")
+                saved.append(restored)
+                if on_image:
+                    on_image(*restored)
+            elif progressive:
+                # Drafts are small enough to make right here, so each shows up as soon as its photo is downloaded
+                # instead of waiting behind full renders in the pool
+                filename = stem + extensions[0]
+                draft = render_draft(file, data, get_draft_compositor(player_data), output_dir, stem)
+                if draft:
+                    drafts[filename] = draft
+                    if on_draft:
+                        on_draft(filename, draft)
+                with timed('queue_wait'):
+                    queued_bytes.acquire(len(data))
+                renders.put(filename, source_quality(data), (file, data, stem, digest, output_key))
+            else:
+                submit_render(file, data, stem, digest, output_key)
+            feed.task_done(True)
+            if feed.accepted >= num_samples:
+                # Enough distinct photos; let the crawler wind down
+                feed.stop()
+                break
+            waiting_since = time.perf_counter()
+        fetch_thread.join()
+        if progressive:
+            renders.close()
+            dispatcher.join()
+        # Wait for all processing, and reporting, to finish
+        for f in futures:
+            f.result()
+        if accepted_digests:
+            get_source_cache().save_selection(selection_key(player_data), accepted_digests)
+    finally:
+        # Also reached when something above raises: the crawler's downloaders would otherwise block on the
+        # feed forever, and the dispatcher on a queue nobody closes
+        feed.stop()
+        if renders is not None:
+            # Renders that never started won't replace their drafts
+            for item in renders.close(discard=True):
+                drop_draft(item[2] + extensions[0])
+        if own_pool:
+            pool.shutdown()
+    output_cache.evict()
     end = time.time()
     print(f"Total time: {end - start} seconds")
+    return len(saved)
 
 
-def run_player_image_pipeline(player_name, pick_number, num_samples=15):
+# temp_dir and output_dir are wiped at the start of the run, so concurrent runs must each use their own
+def run_player_image_pipeline(player_name, pick_number, num_samples=15, on_image=None,
+                              temp_dir=TEMP_DIR, output_dir=OUTPUT_DIR, profile=None, pool=None,
+                              progressive=False, on_draft=None, renders=None, on_draft_failed=None):
     player_data = find_closest_player(player_name)
     if not player_data:
         return False, f"Could not find player: {player_name}"
     player_data["Pick"] = int(pick_number)
-    clear_final_images()
-    clear_temp_images() # Clear in case there was an interuption in the previous run
-    generate_samples(player_data, num_samples)
-    clear_temp_images()
+    clear_final_images(output_dir)
+    clear_temp_images(temp_dir) # Clear in case there was an interuption in the previous run
+    generate_samples(player_data, num_samples, on_image=on_image, output_dir=output_dir, profile=profile, pool=pool,
+                     progressive=progressive, on_draft=on_draft, renders=renders, on_draft_failed=on_draft_failed)
+    clear_temp_images(temp_dir)
     return True, player_data["Name"]
 
 
+# Parses a pasted pick list into [(player_name, pick)], one line per pick, skipping blank lines.
+# A line without a pick number comes back as (line, None), so the batch can report it.
+def parse_pick_list(text):
+    picks = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        match = PICK_FIRST_PATTERN.match(line)
+        if match:
+            picks.append((match.group(2).strip(), int(match.group(1))))
+            continue
+        match = PICK_LAST_PATTERN.match(line)
+        if match:
+            picks.append((match.group(1).strip(), int(match.group(2))))
+        else:
+            picks.append((line, None))
+    return picks
+
+
+# Generates graphics for a list of (player_name, pick) pairs, such as a whole round pasted from a pick list.
+# The batch shares one compositing pool, the crawl session and the cached prospect index, fonts and templates,
+# and runs up to `parallel` players at once, each into output_dir/<pick>_<player>.
+# on_result(entry) is called as each player finishes, with entry holding player, pick, ok, and then either
+# name, dir (relative to output_dir) and count, or error. A player that can't be matched or fails to render
+# is reported and the rest of the batch carries on. on_image(entry, filename, preview_filename) is called
+# per graphic, with filenames relative to the player's directory. Returns the entries in pick list order.
+def run_batch(picks, num_samples=15, on_result=None, on_image=None, output_dir=OUTPUT_DIR, profile=None,
+              backend=None, max_workers=None, parallel=BATCH_PARALLEL):
+    profile = profile or OUTPUT_PROFILE
+    if profile not in OUTPUT_PROFILES:
+        raise ValueError(f"Unknown output profile: {profile}")
+    pool = CompositePool(backend, max_workers)
+
+    def run_entry(player_name, pick):
+        entry = {'player': player_name, 'pick': pick, 'ok': False}
+        try:
+            if pick is None:
+                raise ValueError(f"No pick number in: {player_name}")
+            player_data = find_closest_player(player_name)
+            if not player_data:
+                raise ValueError(f"Could not find player: {player_name}")
+            player_data["Pick"] = int(pick)
+            entry.update(name=player_data["Name"], dir=f"{pick}_{player_slug(player_data['Name'])}")
+            entry_dir = os.path.join(output_dir, entry['dir'])
+            clear_final_images(entry_dir)
+            entry['count'] = generate_samples(
+                player_data, num_samples, output_dir=entry_dir, profile=profile, pool=pool,
+                on_image=(lambda file, preview: on_image(entry, file, preview)) if on_image else None,
+            )
+            entry['ok'] = True
+        except Exception as e:
+            print(f"Batch entry {player_name} (pick {pick}) failed: {e}")
+            entry['error'] = str(e)
+        if on_result:
+            on_result(entry)
+        return entry
+
+    start = time.time()
+    trace = current_trace()
+    try:
+        with ThreadPoolExecutor(max_workers=parallel) as runner:
+            futures = [runner.submit(run_traced, trace, run_entry, name, pick) for name, pick in picks]
+            entries = [f.result() for f in futures]
+    finally:
+        pool.shutdown()
+    print(f"Batch of {len(picks)} picks done in {time.time() - start} seconds")
+    return entries
+
+
+# Crawls photos for one player straight into the source cache, unless enough are cached already
+def prefetch_player(player, cache, wanted):
+    from image_feed import CacheStorage
+
+    query = f"{player['Name']} {player['School']}"
+    if cache.count(query) >= wanted:
+        print(f"Already cached: {player['Name']}")
+        return
+    try:
+        screen = cache_screen(data for _, data in cache.get(query))
+        google_crawler = make_crawler(CacheStorage(cache, query, screen))
+        google_crawler.crawl(keyword=query, max_num=wanted, filters=None)
+        print(f"Cached {cache.count(query)} images for {player['Name']}")
+    except Exception as e:
+        print(f"Error prefetching {player['Name']}: {e}")
+
+
+# Warms the source image cache for the top n prospects on the board, so their picks render without network waits
+def prefetch_top_prospects(n, num_samples=15, max_parallel=4, csv_path=PROSPECT_DATA_PATH):
+    index = get_prospect_index(csv_path)
+    index.refresh()
+    cache = get_source_cache()
+    wanted = num_samples * CRAWL_OVERFETCH
+
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=max_parallel) as executor:
+        list(executor.map(lambda player: prefetch_player(player, cache, wanted), index.players[:n]))
+    cache.evict()
+    print(f"Prefetched {min(n, len(index.players))} prospects in {time.time() - start} seconds")
+
+
+# Composites a cached photo under the name-only template and stores it as a pre-rendered layer
+def _prerender_layer(file, data, compositor, player_name, digest, layers):
+    try:
+        with compositor.composite(crop_to_template(data, compositor.size)) as layer:
+            layers.save(player_name, digest, layer)
+    except Exception as e:
+        print(f"Error pre-rendering image {file}: {e}")
+
+
+# Pre-renders photo + name layers for the top n prospects, so at pick time only the pick row is drawn.
+# Photos are taken from the source cache, prefetching any player who isn't cached yet.
+def prerender_top_prospects(n, num_samples=15, max_workers=None, csv_path=PROSPECT_DATA_PATH):
+    index = get_prospect_index(csv_path)
+    index.refresh()
+    cache = get_source_cache()
+    layers = LayerStore()
+    wanted = num_samples * CRAWL_OVERFETCH
+    max_workers = max_workers or COMPOSITE_WORKERS or min(8, os.cpu_count() or 4)
+
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for player in index.players[:n]:
+            queries = (f"{player['Name']} {player['School']}", player['Name'])
+            prefetch_player(player, cache, wanted)
+            name_layer, pick_row_position = add_name_to_template(player)
+            # Analyzed once and shared by all of this player's photos
+            compositor = OverlayCompositor(name_layer)
+            layers.save_layout(player['Name'], pick_row_position)
+
+            # Same selection as generate_samples: the first num_samples distinct, usable photos
+            seen_digests = set()
+            seen_hashes = []
+            futures = []
+            for query in queries:
+                for digest, data in cache.get(query, skip=seen_digests):
+                    if len(seen_hashes) >= num_samples:
+                        break
+                    if source_image_problem(data):
+                        continue
+                    seen_digests.add(digest)
+                    image_hash = perceptual_hash(data)
+                    if is_near_duplicate(image_hash, seen_hashes):
+                        continue
+                    seen_hashes.append(image_hash)
+                    if not layers.has(player['Name'], digest):
+                        futures.append(executor.submit(
+                            _prerender_layer, digest[:12], data, compositor, player['Name'], digest, layers
+                        ))
+            for f in futures:
+                f.result()
+            print(f"Pre-rendered {len(seen_hashes)} layers for {player['Name']}")
+    print(f"Pre-rendered {min(n, len(index.players))} prospects in {time.time() - start} seconds")
+
+
+# Players from the top of the board whose names warm_up lays out ahead of time
+WARM_UP_PLAYERS = 32
+
+
+# Loads everything the first pick would otherwise wait on: the crawler modules, the prospect index, the base
+# template, PIL's encoders, and the fonts and fitted name sizes for the top of the board.
+# Returns how long each step took, in seconds.
+def warm_up(csv_path=PROSPECT_DATA_PATH):
+    timings = {}
+
+    def step(name, fn):
+        began = time.perf_counter()
+        fn()
+        timings[name] = time.perf_counter() - began
+
+    def load_crawler():
+        crawler_class()
+        import image_feed  # noqa: F401
+
+    def load_encoders():
+        Image.init()
+        sample = Image.new('RGBA', (8, 8))
+        for image_format, options, _ in OUTPUT_PROFILES.values():
+            sample.convert('RGB' if image_format == 'JPEG' else 'RGBA').save(io.BytesIO(), format=image_format, **options)
+
+    def lay_out_names():
+        index = get_prospect_index(csv_path)
+        for player in index.players[:WARM_UP_PLAYERS]:
+            img, pick_row_position = add_name_to_template(player)
+        if index.players:
+            add_pick_row(img, dict(index.players[0], Pick=1), pick_row_position)
+
+    step('crawler', load_crawler)
+    step('prospect_index', lambda: get_prospect_index(csv_path).refresh())
+    step('template', load_base_template)
+    step('encoders', load_encoders)
+    step('fonts', lay_out_names)
+    print(f"Warmed up in {sum(timings.values())} seconds")
+    return timings
+
+
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate draft pick graphics for a prospect.")
+    parser.add_argument('--prefetch', type=int, metavar='N',
+                        help="warm the source image cache for the top N prospects and exit")
+    parser.add_argument('--prerender', type=int, metavar='N',
+                        help="pre-render photo and name layers for the top N prospects and exit")
+    parser.add_argument('--batch', metavar='FILE',
+                        help="generate graphics for a pick list (one \"pick player\" per line, - for stdin) and exit")
+    parser.add_argument('--num-samples', type=int, default=15, help="images per player in --batch mode")
+    args = parser.parse_args()
+    if args.prefetch:
+        prefetch_top_prospects(args.prefetch)
+    if args.prerender:
+        prerender_top_prospects(args.prerender)
+    if args.batch:
+        if args.batch == '-':
+            pick_list = sys.stdin.read()
+        else:
+            with open(args.batch, encoding='utf-8') as f:
+                pick_list = f.read()
+        clear_final_images()
+        entries = run_batch(parse_pick_list(pick_list), max(1, args.num_samples), on_result=lambda entry: print(
+            f"Pick {entry['pick']}: {entry['name']}, {entry['count']} graphics in {entry['dir']}" if entry['ok']
+            else f"Pick {entry['pick']}: {entry['error']}"
+        ))
+        raise SystemExit(0 if any(entry['ok'] for entry in entries) else 1)
+    if args.prefetch or args.prerender:
+        raise SystemExit(0)
+
     name = input("Enter player name: ")
     pick = int(input("Enter pick number: "))
     num_samples = input("How many images to generate? (default 15): ")
@@ -0,0 +1,43 @@
+import hashlib
+import os
+from render_cache import LRUCache
+
+# Served files whose digests stay in memory
+FILE_DIGEST_CACHE_SIZE = 4096
+
+
+# Short SHA-256 of a file's contents, used as its version in URLs and as its ETag
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:20]
+
+
+class FileDigests:
+    """
+    Content digests of served files, computed once per file version.
+
+    A cached digest is reused as long as the file's size and mtime are
+    unchanged, so a graphic is hashed when it's announced and never again
+    when it's served or listed.
+    """
+
+    def __init__(self, maxsize=FILE_DIGEST_CACHE_SIZE):
+        self._cache = LRUCache(maxsize)
+
+    def get(self, path):
+        stat = os.stat(path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        cached = self._cache.get(path)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        digest = file_digest(path)
+        self._cache.put(path, (version, digest))
+        return digest
+
+
+# URL of a file under /final_graphics that changes whenever its contents do
+def versioned_url(relative_path, digest):
+    return f"/final_graphics/{relative_path}?v={digest}"
@@ -0,0 +1,169 @@
+import os
+import queue
+import threading
+from icrawler import ImageDownloader
+from icrawler.storage import BaseStorage
+
+# How many downloaded images may wait for a compositing slot before
+# the crawler's downloader threads are made to wait.
+FEED_QUEUE_SIZE = int(os.environ.get('DRAFTER_FEED_QUEUE_SIZE', 8))
+
+
+class ImageFeed:
+    """
+    Bounded hand-off of finished downloads from the crawler to the compositor.
+
+    Downloader threads put (name, bytes) pairs in, and the compositing loop
+    iterates over them as they arrive. A full queue blocks the downloaders
+    instead of letting images pile up, and `stop()` releases any downloader
+    still waiting once the consumer no longer wants more images.
+
+    Crawls feeding the same consumer share its URL set through `claim_url`,
+    so a photo found by two queries is only downloaded once.
+    """
+
+    _DONE = object()
+
+    def __init__(self, maxsize=FEED_QUEUE_SIZE):
+        self._queue = queue.Queue(maxsize=maxsize)
+        self.stopped = threading.Event()
+        self._cond = threading.Condition()
+        self._pending = 0
+        self.accepted = 0
+        self._urls = set()
+        self._urls_lock = threading.Lock()
+
+    # Returns True the first time url is claimed, False if another crawl already has it
+    def claim_url(self, url):
+        with self._urls_lock:
+            if url in self._urls:
+                return False
+            self._urls.add(url)
+            return True
+
+    def _put(self, item):
+        while not self.stopped.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    # Called from downloader threads; returns False if the consumer has stopped
+    def put(self, name, data):
+        with self._cond:
+            self._pending += 1
+        if self._put((name, data)):
+            return True
+        self.task_done(False)
+        return False
+
+    # Called by the consumer once per item, saying whether it kept the image
+    def task_done(self, accepted):
+        with self._cond:
+            self._pending -= 1
+            if accepted:
+                self.accepted += 1
+            self._cond.notify_all()
+
+    # Blocks until the consumer has looked at everything put so far, or has stopped
+    def wait_idle(self):
+        with self._cond:
+            self._cond.wait_for(lambda: self._pending == 0 or self.stopped.is_set())
+
+    # Called once the crawl has finished so the consumer loop can end
+    def close(self):
+        self._put(self._DONE)
+
+    # Called by the consumer when it doesn't want any more images
+    def stop(self):
+        self.stopped.set()
+        with self._cond:
+            self._cond.notify_all()
+
+    def __iter__(self):
+        while True:
+            item = self._queue.get()
+            if item is self._DONE:
+                return
+            yield item
+
+
+# Stores a download in the source cache if screen (returning why a photo isn't usable, or None) passes it.
+# Caching is best-effort: icrawler doesn't catch errors from storage, so one would end the downloader thread.
+def cache_photo(cache, query, data, screen=None):
+    try:
+        if screen is None or screen(data) is None:
+            cache.put(query, data)
+    except Exception as e:
+        print(f"Could not cache photo for {query}: {e}")
+
+
+class FeedStorage(BaseStorage):
+    """
+    icrawler storage backend that hands each download to an ImageFeed in memory.
+
+    If a SourceCache is given, each download is also stored there under the crawl's query, once it's
+    been handed to the feed, and only if `screen` passes it.
+    """
+
+    def __init__(self, feed, cache=None, query=None, screen=None):
+        self.feed = feed
+        self.cache = cache
+        self.query = query
+        self.screen = screen
+
+    def write(self, id, data):
+        self.feed.put(id, data)
+        if self.cache is not None:
+            cache_photo(self.cache, self.query, data, self.screen)
+
+    def exists(self, id):
+        return False
+
+    def max_file_idx(self):
+        return 0
+
+
+class CacheStorage(BaseStorage):
+    """icrawler storage backend that only fills a SourceCache, used to prefetch photos ahead of time."""
+
+    def __init__(self, cache, query, screen=None):
+        self.cache = cache
+        self.query = query
+        self.screen = screen
+
+    def write(self, id, data):
+        cache_photo(self.cache, self.query, data, self.screen)
+
+    def exists(self, id):
+        return False
+
+    def max_file_idx(self):
+        return 0
+
+
+class FeedDownloader(ImageDownloader):
+    """
+    ImageDownloader that stops the crawl once its ImageFeed's consumer has all the images it wants,
+    and skips URLs another crawl into the same feed has already downloaded.
+
+    The per-image request timeout and retry count come from the constructor
+    (icrawler's extra_downloader_args), since GoogleImageCrawler.crawl doesn't pass them through.
+    """
+
+    def __init__(self, *args, request_timeout=5, max_retry=3, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.request_timeout = request_timeout
+        self.max_retry = max_retry
+
+    def download(self, task, default_ext, timeout=5, max_retry=3, **kwargs):
+        if isinstance(self.storage, FeedStorage) and not self.storage.feed.claim_url(task['file_url']):
+            return
+        return super().download(task, default_ext, self.request_timeout, self.max_retry, **kwargs)
+
+    def reach_max_num(self):
+        if isinstance(self.storage, FeedStorage) and self.storage.feed.stopped.is_set():
+            return True
+        return super().reach_max_num()
@@ -0,0 +1,168 @@
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict, deque
+from metrics import Trace
+
+
+class JobEvents:
+    """
+    Append-only log of a generation job's events.
+
+    The pipeline publishes one event per finished graphic and a final "done"
+    event. Readers keep a cursor (the number of events already seen) and
+    block in `wait` until something newer arrives, so each event reaches
+    each reader exactly once without anyone scanning the output directory.
+    The job's gallery (its image events) is kept as its own list as they're
+    published, so listing it, or just what's new since a cursor, is a slice.
+    """
+
+    def __init__(self):
+        self._events = []
+        self._images = []
+        self._cond = threading.Condition()
+        self.finished = False
+
+    def publish(self, event_type, **data):
+        with self._cond:
+            if self.finished:
+                return
+            self._events.append(dict(data, type=event_type))
+            if event_type == 'image':
+                self._images.append(data)
+            self._cond.notify_all()
+
+    def finish(self, **data):
+        with self._cond:
+            if self.finished:
+                return
+            self._events.append(dict(data, type='done'))
+            self.finished = True
+            self._cond.notify_all()
+
+    # Returns the events after cursor, waiting up to timeout seconds for one to arrive
+    def wait(self, cursor=0, timeout=None):
+        with self._cond:
+            self._cond.wait_for(lambda: len(self._events) > cursor, timeout=timeout)
+            return self._events[cursor:]
+
+    # The job's images after the first `since`, in the order they were published
+    def images(self, since=0):
+        with self._cond:
+            return [dict(image) for image in self._images[since:]]
+
+
+class Job:
+    """One queued or running generation, with its own event log, stage timings and status."""
+
+    def __init__(self, job_id, params):
+        self.id = job_id
+        self.params = params
+        self.status = 'queued'
+        self.error = None
+        self.result = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.events = JobEvents()
+        self.trace = Trace()
+        # Full renders a progressive job hasn't started yet (a RenderQueue), so the gallery can reorder them
+        self.renders = None
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'params': self.params,
+            'result': self.result,
+            'error': self.error,
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished,
+            'images': self.events.images(),
+        }
+
+
+class JobScheduler:
+    """
+    Runs jobs first-in first-out on a fixed number of worker threads.
+
+    `run_job(job)` does the actual work and returns the job's result; if it
+    raises, the job is marked failed. Only the newest `history` jobs are kept,
+    and `on_evict(job)` is called for older ones so their files can be removed.
+    """
+
+    def __init__(self, run_job, max_concurrent=2, history=100, on_evict=None):
+        self.run_job = run_job
+        self.max_concurrent = max_concurrent
+        self.history = history
+        self.on_evict = on_evict
+        self._queue = deque()
+        self._jobs = OrderedDict()
+        self._cond = threading.Condition()
+        self._active = 0
+        for i in range(max_concurrent):
+            threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True).start()
+
+    def submit(self, **params):
+        job = Job(uuid.uuid4().hex[:12], params)
+        evicted = []
+        with self._cond:
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.history:
+                oldest = next(iter(self._jobs.values()))
+                if oldest.status in ('queued', 'running'):
+                    break
+                evicted.append(self._jobs.pop(oldest.id))
+            self._queue.append(job)
+            self._cond.notify()
+        for old_job in evicted:
+            if self.on_evict:
+                self.on_evict(old_job)
+        return job
+
+    def get(self, job_id):
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def queue_depth(self):
+        with self._cond:
+            return len(self._queue)
+
+    # 1-based position of a job in the waiting queue, or None if it isn't waiting
+    def queue_position(self, job_id):
+        with self._cond:
+            for position, job in enumerate(self._queue, start=1):
+                if job.id == job_id:
+                    return position
+        return None
+
+    def active_count(self):
+        with self._cond:
+            return self._active
+
+    # Number of retained jobs in each status
+    def status_counts(self):
+        with self._cond:
+            return dict(Counter(job.status for job in self._jobs.values()))
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queue)
+                job = self._queue.popleft()
+                self._active += 1
+            job.status = 'running'
+            job.started = time.time()
+            try:
+                job.result = self.run_job(job)
+                job.status = 'done'
+            except Exception as e:
+                job.error = str(e)
+                job.status = 'failed'
+                print(f"Job {job.id} failed: {e}")
+            finally:
+                job.finished = time.time()
+                job.events.finish(status=job.status, result=job.result, error=job.error)
+                with self._cond:
+                    self._active -= 1
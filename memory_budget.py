@@ -0,0 +1,44 @@
+import os
+import threading
+
+# Memory that queued and running composites may use between them, across all jobs in the process
+MEMORY_BUDGET_BYTES = int(os.environ.get('DRAFTER_MEMORY_BUDGET_MB', 256)) * 1024 * 1024
+
+
+class MemoryBudget:
+    """
+    Byte budget shared by everything compositing in this process.
+
+    Work reserves its estimated peak memory before it's queued and releases
+    it when finished. Reserving blocks while the budget is spent, which stops
+    the caller taking more downloads off its feed, and the full feed in turn
+    blocks the crawler. A reservation bigger than the whole budget is let
+    through once nothing else is in flight, so it can never wait forever.
+    """
+
+    def __init__(self, limit=MEMORY_BUDGET_BYTES):
+        self.limit = limit
+        self.used = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, amount):
+        with self._cond:
+            self._cond.wait_for(lambda: self.used == 0 or self.used + amount <= self.limit)
+            self.used += amount
+
+    def release(self, amount):
+        with self._cond:
+            self.used -= amount
+            self._cond.notify_all()
+
+
+_default_budget = None
+_default_budget_lock = threading.Lock()
+
+
+def get_memory_budget():
+    global _default_budget
+    with _default_budget_lock:
+        if _default_budget is None:
+            _default_budget = MemoryBudget()
+        return _default_budget
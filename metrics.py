@@ -0,0 +1,157 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds, in seconds, of the duration histogram buckets
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# Spans kept per trace; past this only the per-stage totals keep counting
+MAX_TRACE_SPANS = 2000
+
+
+class Histogram:
+    """Prometheus-style histogram of durations, with one series per value of a single label."""
+
+    def __init__(self, name, help_text, label, buckets=DURATION_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+        # Compositing processes are forked while other threads may be observing
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset_lock)
+
+    def _reset_lock(self):
+        self._lock = threading.Lock()
+
+    def observe(self, label_value, seconds):
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series['buckets'][i] += 1
+            series['sum'] += seconds
+            series['count'] += 1
+
+    # Lines of the Prometheus text exposition format
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_value, series in sorted(self._series.items()):
+                label = f'{self.label}="{escape_label(label_value)}"'
+                for bound, count in zip(self.buckets, series['buckets']):
+                    lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {count}')
+                lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {series["count"]}')
+                lines.append(f"{self.name}_sum{{{label}}} {series['sum']:.6f}")
+                lines.append(f"{self.name}_count{{{label}}} {series['count']}")
+        return lines
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# A gauge with a single value, or with one series per label value when value is a dict
+def render_gauge(name, help_text, value, label=None):
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+    if label is None:
+        lines.append(f"{name} {value}")
+    else:
+        for label_value, series_value in sorted(value.items()):
+            lines.append(f'{name}{{{label}="{escape_label(label_value)}"}} {series_value}')
+    return lines
+
+
+STAGE_SECONDS = Histogram('drafter_stage_seconds', "Time spent in each pipeline stage.", 'stage')
+REQUEST_SECONDS = Histogram('drafter_http_request_seconds', "Time to handle each server route.", 'route')
+
+
+class Trace:
+    """
+    Timeline of one job: every timed stage, from whichever thread or worker
+    process ran it, as (stage, start, seconds) spans plus per-stage totals.
+    """
+
+    def __init__(self):
+        self.created = time.time()
+        self._spans = []
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds, start=None, **labels):
+        span = dict(labels, stage=stage, start=start if start is not None else time.time() - seconds,
+                    seconds=seconds)
+        with self._lock:
+            if len(self._spans) < MAX_TRACE_SPANS:
+                self._spans.append(span)
+            totals = self._stages.setdefault(stage, {'count': 0, 'total': 0.0, 'max': 0.0})
+            totals['count'] += 1
+            totals['total'] += seconds
+            totals['max'] = max(totals['max'], seconds)
+
+    def spans(self):
+        with self._lock:
+            return list(self._spans)
+
+    def to_dict(self):
+        with self._lock:
+            spans = [dict(span, start=span['start'] - self.created) for span in self._spans]
+            stages = {stage: dict(totals) for stage, totals in self._stages.items()}
+        spans.sort(key=lambda span: span['start'])
+        return {'created': self.created, 'stages': stages, 'spans': spans}
+
+
+# The trace that stages timed on this thread are added to
+_local = threading.local()
+
+
+def current_trace():
+    return getattr(_local, 'trace', None)
+
+
+@contextmanager
+def tracing(trace):
+    previous = current_trace()
+    _local.trace = trace
+    try:
+        yield trace
+    finally:
+        _local.trace = previous
+
+
+# Runs fn on the calling thread with trace as its current trace, for work handed to pool threads
+def run_traced(trace, fn, *args, **kwargs):
+    with tracing(trace):
+        return fn(*args, **kwargs)
+
+
+# Records one finished stage in the stage histogram and, if there is one, the current trace
+def record(stage, seconds, start=None, **labels):
+    STAGE_SECONDS.observe(stage, seconds)
+    trace = current_trace()
+    if trace is not None:
+        trace.add(stage, seconds, start, **labels)
+
+
+# Adds spans recorded in another process (see Trace.spans) to trace and the stage histogram
+def merge_spans(trace, spans):
+    for span in spans:
+        STAGE_SECONDS.observe(span['stage'], span['seconds'])
+        if trace is not None:
+            labels = {key: value for key, value in span.items() if key not in ('stage', 'seconds', 'start')}
+            trace.add(span['stage'], span['seconds'], span['start'], **labels)
+
+
+@contextmanager
+def timed(stage, **labels):
+    start = time.time()
+    began = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - began, start, **labels)
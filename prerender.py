@@ -0,0 +1,107 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+from source_cache import atomic_path, evict_files, write_atomic
+
+# Photo + name layers rendered ahead of the draft, one directory per player
+PRERENDER_DIR = os.environ.get('DRAFTER_PRERENDER_DIR', os.path.join('cache', 'prerender'))
+# Finished graphics by (player, pick, source photo, profile), so resubmitting a pick is a file copy
+OUTPUT_CACHE_DIR = os.environ.get('DRAFTER_OUTPUT_CACHE', os.path.join('cache', 'outputs'))
+OUTPUT_CACHE_MAX_BYTES = int(os.environ.get('DRAFTER_OUTPUT_CACHE_MB', 1024)) * 1024 * 1024
+OUTPUT_CACHE_MAX_AGE = 7 * 24 * 60 * 60
+
+
+def player_slug(name):
+    return re.sub(r'[^a-z0-9]+', '_', name.lower()).strip('_')
+
+
+class LayerStore:
+    """
+    Pre-rendered layers: each source photo already cropped and composited under
+    a template carrying only the player's name. Alongside them, layout.json
+    records where the pick row goes, so finishing a graphic at pick time is
+    one text draw and an encode.
+    """
+
+    def __init__(self, root=PRERENDER_DIR):
+        self.root = root
+
+    def _player_dir(self, player_name):
+        return os.path.join(self.root, player_slug(player_name))
+
+    def layer_path(self, player_name, digest):
+        return os.path.join(self._player_dir(player_name), f"{digest}.png")
+
+    def has(self, player_name, digest):
+        return os.path.exists(self.layer_path(player_name, digest))
+
+    def save(self, player_name, digest, img):
+        path = self.layer_path(player_name, digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Layers are re-read at pick time, so favor fast decoding over small files
+        with atomic_path(path) as temp_path:
+            img.save(temp_path, format='PNG', compress_level=1)
+
+    def save_layout(self, player_name, pick_row_position):
+        os.makedirs(self._player_dir(player_name), exist_ok=True)
+        layout = {'pick_row': list(pick_row_position)}
+        write_atomic(os.path.join(self._player_dir(player_name), 'layout.json'), json.dumps(layout).encode('utf-8'))
+
+    # Where the pick row goes for this player's layers, or None if nothing was pre-rendered
+    def load_layout(self, player_name):
+        try:
+            with open(os.path.join(self._player_dir(player_name), 'layout.json'), encoding='utf-8') as f:
+                return tuple(json.load(f)['pick_row'])
+        except (OSError, ValueError, KeyError):
+            return None
+
+
+class OutputCache:
+    """Finished graphics and their previews, keyed by everything that determines their pixels."""
+
+    def __init__(self, root=OUTPUT_CACHE_DIR, max_bytes=OUTPUT_CACHE_MAX_BYTES, max_age=OUTPUT_CACHE_MAX_AGE):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+
+    @staticmethod
+    def key(player_data, digest, profile, preview_size):
+        parts = [player_data['Name'], player_data['Position'], player_data['School'], player_data['Pick'],
+                 digest, profile, preview_size]
+        return hashlib.sha1(json.dumps(parts).encode('utf-8')).hexdigest()
+
+    def _paths(self, key, result):
+        filename, preview_filename = result
+        return (os.path.join(self.root, key + os.path.splitext(filename)[1]),
+                os.path.join(self.root, key + '.preview' + os.path.splitext(preview_filename)[1]))
+
+    # Copies a rendered graphic and its preview into the cache. Best-effort: the graphic has already been made,
+    # so a full or unwritable cache only costs the next run a re-render.
+    def store(self, key, output_dir, result):
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            for source, target in zip(result, self._paths(key, result)):
+                with atomic_path(target) as temp_path:
+                    shutil.copyfile(os.path.join(output_dir, source), temp_path)
+        except OSError as e:
+            print(f"Could not cache render {result[0]}: {e}")
+
+    # Copies a cached graphic into output_dir as <stem>, returning (filename, preview_filename) like
+    # process_image, or None on a miss. extensions is (graphic extension, preview extension).
+    def restore(self, key, output_dir, stem, extensions, preview_dir):
+        result = (stem + extensions[0], f"{preview_dir}/{stem}{extensions[1]}")
+        cached = self._paths(key, result)
+        if not all(os.path.exists(path) for path in cached):
+            return None
+        now = time.time()
+        for source, target in zip(cached, result):
+            with atomic_path(os.path.join(output_dir, target)) as temp_path:
+                shutil.copyfile(source, temp_path)
+            os.utime(source, (now, now))
+        return result
+
+    def evict(self):
+        return evict_files(self.root, self.max_bytes, self.max_age)
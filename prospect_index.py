@@ -0,0 +1,206 @@
+import csv
+import difflib
+import heapq
+import json
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+
+NGRAM_SIZE = 3
+
+# How many pre-filtered candidates get the full similarity score.
+# Keeps lookups flat as the board grows to thousands of names.
+MAX_CANDIDATES = 16
+
+# Grams on more names than this ("an ", " ja") say little about which name was meant and would make the
+# lookup walk most of the board, so they're left out of the overlap count. A query whose grams are all
+# this common is still counted on its MIN_QUERY_GRAMS rarest ones.
+MAX_GRAM_POSTINGS = 500
+MIN_QUERY_GRAMS = 3
+
+# Generational suffixes one board prints and another leaves off ("Emery Jones Jr." and "Emery Jones")
+NAME_SUFFIXES = {'jr', 'sr', 'ii', 'iii', 'iv', 'v'}
+
+
+# Lower-case and strip punctuation so "Cam Ward" and "cam ward." index the same
+def normalize_name(name):
+    name = re.sub(r"[^a-z0-9 ]+", "", name.lower())
+    return " ".join(name.split())
+
+
+# The name a player is merged under, without a generational suffix
+def merge_name(name):
+    tokens = normalize_name(name).split()
+    while len(tokens) > 1 and tokens[-1] in NAME_SUFFIXES:
+        tokens.pop()
+    return " ".join(tokens)
+
+
+# School without the boards' differing qualifiers and abbreviations, so "Miami (Fla.)" matches "Miami"
+# and "Arizona St." matches "Arizona State"
+def normalize_school(school):
+    school = re.sub(r"\(.*?\)", "", school or "")
+    school = re.sub(r"\bSt\.?$", "State", school.strip())
+    return normalize_name(school)
+
+
+# Merges boards of players, listed in priority order, into one list. A player already on an earlier board
+# is dropped: either the same name once suffixes are ignored, or the only earlier player with the same last
+# name at the same school, which catches first names the boards spell differently ("Cameron"/"Cam Ward").
+def merge_boards(boards):
+    players = []
+    names = set()
+    schools = Counter()
+    for board in boards:
+        added = []
+        seen = set()
+        for player in board:
+            if not player.get('Name'):
+                continue
+            name = merge_name(player['Name'])
+            school = (name.split()[-1] if name else '', normalize_school(player.get('School')))
+            if name in names or schools[school] == 1 or normalize_name(player['Name']) in seen:
+                continue
+            seen.add(normalize_name(player['Name']))
+            added.append((player, name, school))
+        # Only compared with later boards: on the same board, "Name" and "Name Jr." are two players
+        for player, name, school in added:
+            names.add(name)
+            schools[school] += 1
+            players.append(player)
+    return players
+
+
+# Character n-grams of a name, padded so word starts and ends count too
+def name_ngrams(name, n=NGRAM_SIZE):
+    padded = f" {name} "
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+# Players in a prospect CSV, or in a compiled store, which is already merged and loads without CSV parsing
+def read_players(path):
+    if path.endswith('.json'):
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)['players']
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+class ProspectIndex:
+    """
+    In-memory fuzzy index over one or more prospect CSVs or compiled prospect
+    stores (the .json file scrapers/refresh.py writes).
+
+    The files are parsed once and only re-read when one of their mtimes changes.
+    Lookups prune candidates through an n-gram inverted index before running
+    the difflib similarity score, so cost depends on how many names share
+    n-grams with the query rather than on the size of the board.
+    """
+
+    def __init__(self, paths):
+        if isinstance(paths, str):
+            paths = [paths]
+        self.paths = list(paths)
+        self._lock = threading.Lock()
+        self._mtimes = None
+        self.players = []
+        self._names = []
+        self._gram_counts = []
+        self._postings = {}
+        self._tokens = {}
+
+    # Reload the files if any of them changed on disk since the last load
+    def refresh(self):
+        mtimes = tuple(os.path.getmtime(path) if os.path.exists(path) else None for path in self.paths)
+        if mtimes == self._mtimes:
+            return
+        with self._lock:
+            if mtimes != self._mtimes:
+                self._load()
+                self._mtimes = mtimes
+
+    def _load(self):
+        # The first source listed wins when a player is on several boards
+        players = merge_boards(read_players(path) for path in self.paths if os.path.exists(path))
+
+        names = [normalize_name(player['Name']) for player in players]
+        gram_counts = []
+        postings = defaultdict(list)
+        tokens = defaultdict(list)
+        for idx, name in enumerate(names):
+            grams = name_ngrams(name)
+            gram_counts.append(len(grams))
+            for gram in grams:
+                postings[gram].append(idx)
+            for token in set(name.split()):
+                tokens[token].append(idx)
+
+        # Swap everything in at once so concurrent lookups never see a half-built index
+        self.players, self._names, self._gram_counts = players, names, gram_counts
+        self._postings, self._tokens = dict(postings), dict(tokens)
+        print(f"Loaded {len(players)} prospects from {', '.join(self.paths)}")
+
+    def _candidates(self, query):
+        postings, tokens, gram_counts = self._postings, self._tokens, self._gram_counts
+        query_grams = name_ngrams(query)
+        lists = sorted((postings.get(gram, ()) for gram in query_grams), key=len)
+        counts = Counter()
+        for i, posting in enumerate(lists):
+            if i >= MIN_QUERY_GRAMS and len(posting) > MAX_GRAM_POSTINGS:
+                break
+            counts.update(posting)
+        # Rank by n-gram Dice overlap so long names don't crowd out close short ones
+        size = len(query_grams)
+        shortlist = heapq.nlargest(
+            MAX_CANDIDATES, counts, key=lambda idx: counts[idx] / (size + gram_counts[idx])
+        )
+        # An exact hit on a distinctive token ("ward", "hunter") makes the shortlist, rarest tokens first.
+        # Tokens shared by too many names ("jr") don't single anyone out and are skipped.
+        exact = set()
+        for matches in sorted((tokens.get(token, ()) for token in query.split()), key=len):
+            if len(matches) > MAX_CANDIDATES:
+                break
+            exact.update(matches[:MAX_CANDIDATES - len(exact)])
+            if len(exact) >= MAX_CANDIDATES:
+                break
+        return exact.union(shortlist)
+
+    # Returns up to k (player, score) pairs, best first, with score in [0, 1]
+    def search(self, name, k=5, cutoff=0.0):
+        self.refresh()
+        query = normalize_name(name)
+        if not query:
+            return []
+        players, names = self.players, self._names
+        matcher = difflib.SequenceMatcher()
+        matcher.set_seq2(query)
+        scored = []
+        for idx in self._candidates(query):
+            matcher.set_seq1(names[idx])
+            if matcher.real_quick_ratio() < cutoff or matcher.quick_ratio() < cutoff:
+                continue
+            score = matcher.ratio()
+            if score >= cutoff:
+                scored.append((score, idx))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [(players[idx], score) for score, idx in scored[:k]]
+
+    # Returns the single closest player above cutoff, or None
+    def best_match(self, name, cutoff=0.7):
+        matches = self.search(name, k=1, cutoff=cutoff)
+        return matches[0][0] if matches else None
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+# Shared index per set of CSV paths, so every caller reuses the same parsed board
+def get_prospect_index(*paths):
+    key = tuple(paths)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = ProspectIndex(list(paths))
+    return index
@@ -0,0 +1,67 @@
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from PIL import Image, ImageFont
+
+TEMPLATE_PATH = os.path.join('assets', 'draft_template.png')
+FONT_PATH = os.path.join('assets', 'Evogria.otf')
+
+# How many filled overlays (one per player/pick) stay decoded in memory
+RENDER_CACHE_SIZE = int(os.environ.get('DRAFTER_RENDER_CACHE', 32))
+
+
+class LRUCache:
+    """Thread-safe mapping that drops the least recently used entry past maxsize."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        # A forked child may inherit the lock held by a thread that doesn't exist there
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset_lock)
+
+    def _reset_lock(self):
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    # Returns the cached value, building it with factory() on a miss.
+    # factory runs outside the lock, so a slow build doesn't block hits on other keys.
+    def get_or_create(self, key, factory):
+        value = self.get(key)
+        if value is None:
+            value = factory()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+# The blank template, decoded once. Callers must copy() it before drawing on it.
+@lru_cache(maxsize=None)
+def load_base_template(path=TEMPLATE_PATH):
+    return Image.open(path).convert("RGBA")
+
+
+@lru_cache(maxsize=128)
+def load_font(path, size):
+    return ImageFont.truetype(path, size=size)
@@ -0,0 +1,74 @@
+import heapq
+import itertools
+import threading
+
+
+class RenderQueue:
+    """
+    Full-resolution renders of a progressive run that haven't started yet,
+    keyed by the output filename they'll be saved as.
+
+    Renders come out best quality first, except that any the user has asked
+    for (by clicking its preview) jump the queue, most recent request first.
+    `promote` can be called from any thread while the run is taking renders
+    off the queue; asking for one that has already started, or isn't known,
+    does nothing and returns False. `pop` waits for a render to be queued
+    until the queue is closed.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._entries = {}
+        self._order = itertools.count()
+        self._cond = threading.Condition()
+        self.closed = False
+
+    def put(self, filename, quality, item):
+        with self._cond:
+            self._push(filename, (1, -quality, 0), item)
+            self._cond.notify()
+
+    def promote(self, filename):
+        with self._cond:
+            entry = self._entries.get(filename)
+            if entry is None:
+                return False
+            # The entry already in the heap is skipped when it comes up
+            entry[2] = None
+            self._push(filename, (0, -next(self._order), 0), entry[3])
+            return True
+
+    # No more renders will be queued; pop returns None once the rest are taken, or straight away with discard.
+    # Returns the items discarded.
+    def close(self, discard=False):
+        with self._cond:
+            self.closed = True
+            discarded = []
+            if discard:
+                discarded = [entry[3] for entry in self._entries.values()]
+                self._heap = []
+                self._entries = {}
+            self._cond.notify_all()
+            return discarded
+
+    # Removes and returns the next item to render, or None once the queue is closed and empty
+    def pop(self):
+        with self._cond:
+            while True:
+                while self._heap:
+                    _, _, filename, item = heapq.heappop(self._heap)
+                    if filename is not None:
+                        del self._entries[filename]
+                        return item
+                if self.closed:
+                    return None
+                self._cond.wait()
+
+    def __len__(self):
+        with self._cond:
+            return len(self._entries)
+
+    def _push(self, filename, priority, item):
+        entry = [priority, next(self._order), filename, item]
+        self._entries[filename] = entry
+        heapq.heappush(self._heap, entry)
@@ -1,24 +1,17 @@
-import requests
-from bs4 import BeautifulSoup
-import csv
+from scrapers.parsing import make_soup
 
-def fetch_cbs_prospect_rankings():
-    url = "https://www.cbssports.com/nfl/draft/prospect-rankings/"
-    headers = {
-        "User-Agent": "Mozilla/5.0"
-    }
+CBS_URL = "https://www.cbssports.com/nfl/draft/prospect-rankings/"
+CBS_FIELDS = ["Rank", "Name", "Position", "School"]
 
-    response = requests.get(url, headers=headers)
-    if response.status_code != 200:
-        print(f"Failed to fetch data. Status code: {response.status_code}")
-        return
 
-    soup = BeautifulSoup(response.content, "html.parser")
+# Returns the rows of the prospect rankings table as dicts keyed by CBS_FIELDS.
+# Raises ValueError if the page doesn't have the table or columns we expect.
+def parse_cbs_prospect_rankings(html):
+    soup = make_soup(html)
 
     table = soup.find("table")
-    if not table:
-        print("Could not find the prospect rankings table.")
-        return
+    if not table or not table.find("thead") or not table.find("tbody"):
+        raise ValueError("Could not find the prospect rankings table.")
 
     all_headers = [th.text.strip() for th in table.find("thead").find_all("th")]
     wanted_fields = ["Rk", "Player", "Pos", "School"]
@@ -27,27 +20,17 @@ def fetch_cbs_prospect_rankings():
     try:
         wanted_indexes = [all_headers.index(field) for field in wanted_fields]
     except ValueError as e:
-        print(f"One or more target columns not found: {e}")
-        return
+        raise ValueError(f"One or more target columns not found: {e}")
 
-    output_headers = ["Rank", "Name", "Position", "School"]
     rows = []
-
     for tr in table.find("tbody").find_all("tr"):
         tds = tr.find_all("td")
         if len(tds) >= len(all_headers):  # Ensure full row of expected columns
             cells = [td.text.strip() for td in tds]
-            row = [cells[i] for i in wanted_indexes]
-            rows.append(row)
-
-    # Write filtered CSV
-    with open("../data/cbs_prospect_rankings.csv", "w", newline="", encoding="utf-8") as csvfile:
-        writer = csv.writer(csvfile)
-        writer.writerow(output_headers)
-        writer.writerows(rows)
+            rows.append(dict(zip(CBS_FIELDS, (cells[i] for i in wanted_indexes))))
+    return rows
 
-    print("Clean CSV created: 'cbs_prospect_rankings.csv'")
-
-if __name__ == "__main__":
-    fetch_cbs_prospect_rankings()
 
+def fetch_cbs_prospect_rankings():
+    from scrapers.refresh import refresh
+    return refresh(['cbs'])
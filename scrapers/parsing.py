@@ -0,0 +1,12 @@
+from bs4 import BeautifulSoup
+
+# lxml is several times faster than the standard library parser on these pages; it's optional
+try:
+    import lxml
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+
+def make_soup(markup):
+    return BeautifulSoup(markup, HTML_PARSER)
@@ -0,0 +1,202 @@
+# Refreshes the prospect boards and recompiles the prospect store. Run from the repo root:
+#
+#     python -m scrapers.refresh [--source cbs|pff] [--base-url URL] [--data-dir DIR] [--compile-only]
+import argparse
+import csv
+import io
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from scrapers.cbs_scraper import CBS_FIELDS, CBS_URL, parse_cbs_prospect_rankings
+from scrapers.pff_scraper import PFF_FIELDS, PFF_URL, parse_pff_draft_profiles
+from prospect_index import merge_boards
+from source_cache import write_atomic
+
+# Where the snapshots, the validators they were fetched with (STATE_FILE) and the compiled store are kept
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+STATE_FILE = 'scrape_state.json'
+# Every source's players merged into one file, which drafter loads instead of parsing the CSVs
+PROSPECT_STORE_FILE = 'prospects.json'
+
+# Fetch the sources from another host, keeping each page's path, e.g. a local server with saved pages
+BASE_URL = os.environ.get('DRAFTER_SCRAPE_BASE_URL')
+REQUEST_TIMEOUT = 30
+USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+              "Chrome/91.0.4472.124 Safari/537.36")
+
+
+class Source:
+    """One prospect board: where it's published, how to parse it, and the CSV snapshot it's kept in."""
+
+    def __init__(self, name, url, parse, filename, fields):
+        self.name = name
+        self.url = url
+        self.parse = parse
+        self.filename = filename
+        self.fields = fields
+
+    def url_for(self, base_url=None):
+        if not base_url:
+            return self.url
+        parts = urlsplit(self.url)
+        return urljoin(base_url, parts.path + (f"?{parts.query}" if parts.query else ''))
+
+
+# In merge order: when a player is on several boards, the first source listed wins
+SOURCES = {
+    'cbs': Source('cbs', CBS_URL, parse_cbs_prospect_rankings, 'cbs_prospect_rankings.csv', CBS_FIELDS),
+    'pff': Source('pff', PFF_URL, parse_pff_draft_profiles, 'pff_prospect_rankings.csv', PFF_FIELDS),
+}
+
+
+def make_session(pool_size):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['User-Agent'] = USER_AGENT
+    return session
+
+
+def load_state(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def rows_to_csv(rows, fields):
+    buffer = io.StringIO(newline='')
+    writer = csv.DictWriter(buffer, fieldnames=fields)
+    writer.writeheader()
+    writer.writerows(rows)
+    return buffer.getvalue().encode('utf-8')
+
+
+# Fetches one source and, if the page changed, replaces its snapshot.
+# Returns a result dict: status is "updated", "unchanged" or "failed". A failed fetch or a page
+# that parses to no players leaves the last good snapshot, and its validators, where they were.
+def refresh_source(session, source, validators, base_url=None, data_dir=DATA_DIR):
+    url = source.url_for(base_url)
+    path = os.path.join(data_dir, source.filename)
+    headers = {}
+    # Without the snapshot a 304 would leave nothing to keep, so only ask conditionally when there is one
+    if validators and os.path.exists(path):
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+    start = time.perf_counter()
+    try:
+        response = session.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+        if response.status_code == 304:
+            return {'source': source.name, 'status': 'unchanged', 'validators': validators,
+                    'seconds': time.perf_counter() - start}
+        response.raise_for_status()
+        rows = source.parse(response.content)
+        if not rows:
+            raise ValueError("no players found on the page")
+        write_atomic(path, rows_to_csv(rows, source.fields))
+    except Exception as e:
+        return {'source': source.name, 'status': 'failed', 'error': str(e), 'validators': validators,
+                'seconds': time.perf_counter() - start}
+    # Only what the server sent is sent back; a page without validators is fetched in full every time
+    validators = {
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+    }
+    return {'source': source.name, 'status': 'updated', 'rows': len(rows), 'validators': validators,
+            'seconds': time.perf_counter() - start}
+
+
+# Fields every player in the store has, whichever board they came from
+STORE_FIELDS = ('Rank', 'Name', 'Position', 'School')
+
+
+# One line of text, for snapshots written before the parsers kept fields to a single line
+def clean_field(value):
+    return ' '.join((value or '').strip().split('\n')[0].split())
+
+
+# One source's snapshot as store records
+def read_snapshot(source, data_dir=DATA_DIR):
+    with open(os.path.join(data_dir, source.filename), newline='', encoding='utf-8') as f:
+        return [dict({field: clean_field(player.get(field)) for field in STORE_FIELDS}, Source=source.name)
+                for player in csv.DictReader(f)]
+
+
+# Merges the sources' snapshots into the prospect store, written atomically. Returns how many players it holds.
+def compile_store(sources, data_dir=DATA_DIR):
+    players = merge_boards(
+        read_snapshot(source, data_dir) for source in sources
+        if os.path.exists(os.path.join(data_dir, source.filename))
+    )
+    store = {'sources': [source.name for source in sources], 'compiled': time.time(), 'players': players}
+    write_atomic(os.path.join(data_dir, PROSPECT_STORE_FILE), json.dumps(store, separators=(',', ':')).encode('utf-8'))
+    return len(players)
+
+
+# Refreshes the named sources (all of them by default) at once over one pooled session, then recompiles
+# the prospect store from whatever snapshots are on disk. Returns the per-source results.
+def refresh(names=None, base_url=BASE_URL, data_dir=DATA_DIR):
+    names = names or list(SOURCES)
+    unknown = [name for name in names if name not in SOURCES]
+    if unknown:
+        raise ValueError(f"Unknown source: {', '.join(unknown)}")
+    state_path = os.path.join(data_dir, STATE_FILE)
+    store_path = os.path.join(data_dir, PROSPECT_STORE_FILE)
+    state = load_state(state_path)
+    session = make_session(len(names))
+    with ThreadPoolExecutor(max_workers=len(names)) as executor:
+        results = list(executor.map(
+            lambda name: refresh_source(session, SOURCES[name], state.get(name), base_url, data_dir), names
+        ))
+    session.close()
+
+    for result in results:
+        if result['status'] == 'failed':
+            print(f"{result['source']}: failed ({result['error']}), keeping the last snapshot")
+        elif result['status'] == 'unchanged':
+            print(f"{result['source']}: unchanged")
+        else:
+            print(f"{result['source']}: {result['rows']} players in {result['seconds']:.2f} seconds")
+
+    for result in results:
+        if result['status'] == 'updated':
+            state[result['source']] = result['validators']
+    write_atomic(state_path, json.dumps(state, indent=2).encode('utf-8'))
+    if any(result['status'] == 'updated' for result in results) or not os.path.exists(store_path):
+        count = compile_store(list(SOURCES.values()), data_dir)
+        print(f"Compiled {count} prospects into {store_path}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh the prospect boards and recompile the prospect store")
+    parser.add_argument('--source', action='append', choices=list(SOURCES),
+                        help="only refresh this source (repeatable); all of them by default")
+    parser.add_argument('--base-url', default=BASE_URL,
+                        help="fetch every page from this host instead, keeping its path (for saved pages)")
+    parser.add_argument('--data-dir', default=DATA_DIR,
+                        help="directory of the snapshots, their validators and the prospect store")
+    parser.add_argument('--compile-only', action='store_true',
+                        help="recompile the prospect store from the snapshots on disk without fetching")
+    args = parser.parse_args()
+    if args.compile_only:
+        count = compile_store(list(SOURCES.values()), args.data_dir)
+        print(f"Compiled {count} prospects into {os.path.join(args.data_dir, PROSPECT_STORE_FILE)}")
+        return
+    results = refresh(args.source, base_url=args.base_url, data_dir=args.data_dir)
+    if all(result['status'] == 'failed' for result in results):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,203 @@
-from flask import Flask, render_template_string, request, redirect, url_for, jsonify
+from flask import (Flask, Response, abort, g, render_template_string, request, redirect, send_file, url_for, jsonify,
+                   stream_with_context)
+from werkzeug.security import safe_join
 import os
-from drafter import run_player_image_pipeline, find_closest_player
-from threading import Thread
+import re
+import json
+import shutil
+import threading
+import time
+from drafter import (run_player_image_pipeline, run_batch, parse_pick_list, find_closest_player, warm_up,
+                     OUTPUT_PROFILES, OUTPUT_PROFILE, PREVIEW_PROFILE, PREVIEW_DIR)
+from jobs import JobScheduler
+from gallery_index import FileDigests, versioned_url
+from metrics import REQUEST_SECONDS, STAGE_SECONDS, record, render_gauge, tracing
+from render_cache import LRUCache
+from memory_budget import get_memory_budget
+from zip_stream import stream_zip
+from render_queue import RenderQueue
 
 gallery_dir = os.path.join(os.path.dirname(__file__), 'final_graphics')
+temp_dir = os.path.join(os.path.dirname(__file__), 'temp_images')
+
+# How many generations may render at once; the rest wait in FIFO order
+MAX_CONCURRENT_JOBS = int(os.environ.get('DRAFTER_MAX_JOBS', 2))
+# Finished jobs kept (with their graphics) before the oldest are cleaned up
+JOB_HISTORY = int(os.environ.get('DRAFTER_JOB_HISTORY', 100))
+
+# Seconds between keep-alive comments on an idle event stream
+STREAM_HEARTBEAT = 15
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.webp')
+JOB_ID_PATTERN = re.compile(r'^[0-9a-f]{12}$')
+
+# Graphics are requested with ?v=<content digest>, so a URL's bytes never change and can be cached for good
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+file_digests = FileDigests()
+# Galleries of jobs no longer in memory, read from disk once; their files don't change after the job ends
+disk_galleries = LRUCache(64)
+
+
+# Gallery entry for a saved graphic, with content-versioned URLs. Paths are relative to gallery_dir.
+# Hashing here, as the graphic is announced, means serving it never has to.
+def gallery_entry(file, preview, **extra):
+    return dict(
+        extra, file=file, preview=preview,
+        url=versioned_url(file, file_digests.get(os.path.join(gallery_dir, file))),
+        preview_url=versioned_url(preview, file_digests.get(os.path.join(gallery_dir, preview))),
+    )
+
+
+# Gallery entry for a progressive job's draft of a graphic that's still being rendered at full size.
+# file is where the graphic will be; the gallery swaps in the full render when an image event names it.
+def draft_entry(file, draft):
+    return dict(file=file, preview=draft, preview_url=versioned_url(draft, file_digests.get(os.path.join(gallery_dir, draft))))
+
+
+# Each job renders into its own working and output directory, so overlapping picks never clobber each other.
+# Everything the pipeline times while running the job is added to the job's trace.
+def run_job(job):
+    with tracing(job.trace):
+        record('queue', job.started - job.created, start=job.created)
+        try:
+            if 'picks' in job.params:
+                return run_batch_job(job)
+            return run_pick_job(job)
+        finally:
+            record('job', time.time() - job.started, start=job.started)
+
+
+# A progressive job publishes a "draft" event for every photo before the full renders' "image" events,
+# and a "draft_failed" event for any draft whose full render failed or was never started
+def run_pick_job(job):
+    params = job.params
+    job_temp_dir = os.path.join(temp_dir, job.id)
+    progressive = params.get('progressive', False)
+    if progressive:
+        job.renders = RenderQueue()
+    try:
+        ok, result = run_player_image_pipeline(
+            params['player_name'], params['pick_number'], num_samples=params['num_samples'],
+            on_image=lambda file, preview: job.events.publish(
+                'image', **gallery_entry(f"{job.id}/{file}", f"{job.id}/{preview}")
+            ),
+            temp_dir=job_temp_dir, output_dir=os.path.join(gallery_dir, job.id), profile=params['profile'],
+            progressive=progressive, renders=job.renders,
+            on_draft=lambda file, draft: job.events.publish(
+                'draft', **draft_entry(f"{job.id}/{file}", f"{job.id}/{draft}")
+            ),
+            on_draft_failed=lambda file: job.events.publish('draft_failed', file=f"{job.id}/{file}"),
+        )
+    finally:
+        shutil.rmtree(job_temp_dir, ignore_errors=True)
+    if not ok:
+        raise ValueError(result)
+    return result
+
+
+# A batch publishes each player's graphics as they're saved and a "player" event as each player finishes
+def run_batch_job(job):
+    params = job.params
+    entries = run_batch(
+        params['picks'], num_samples=params['num_samples'], output_dir=os.path.join(gallery_dir, job.id),
+        profile=params['profile'],
+        on_image=lambda entry, file, preview: job.events.publish('image', **gallery_entry(
+            f"{job.id}/{entry['dir']}/{file}", f"{job.id}/{entry['dir']}/{preview}",
+            player=entry['name'], pick=entry['pick'],
+        )),
+        on_result=lambda entry: job.events.publish('player', **entry),
+    )
+    done = sum(entry['ok'] for entry in entries)
+    if not done:
+        raise ValueError("None of the players in the batch could be generated")
+    return f"{done} of {len(entries)} picks"
+
+
+def remove_job_files(job):
+    shutil.rmtree(os.path.join(gallery_dir, job.id), ignore_errors=True)
+
+
+scheduler = JobScheduler(run_job, max_concurrent=MAX_CONCURRENT_JOBS, history=JOB_HISTORY,
+                         on_evict=remove_job_files)
+
+
+# The server starts accepting requests straight away and warms up in the background;
+# /readyz reports ready once the first pick will be as fast as the ones after it
+warmed_up = threading.Event()
+warm_up_report = {}
+
+
+def run_warm_up():
+    try:
+        warm_up_report['timings'] = warm_up()
+    except Exception as e:
+        print(f"Warm-up failed: {e}")
+        warm_up_report['error'] = str(e)
+    finally:
+        warmed_up.set()
+
+
+threading.Thread(target=run_warm_up, name='warm-up', daemon=True).start()
+
+
+# Graphics for a job after the first `since`, from its event log or, for jobs no longer in memory,
+# its output directory
+def job_images(job_id, since=0):
+    job = scheduler.get(job_id)
+    if job is not None:
+        return job.events.images(since)
+    job_dir = os.path.join(gallery_dir, job_id)
+    if not JOB_ID_PATTERN.match(job_id) or not os.path.isdir(job_dir):
+        return []
+
+    def scan():
+        # Batch jobs keep each player's graphics in a subdirectory
+        images = _dir_images(job_id, job_dir)
+        for name in sorted(os.listdir(job_dir)):
+            if name != PREVIEW_DIR and os.path.isdir(os.path.join(job_dir, name)):
+                images += _dir_images(f"{job_id}/{name}", os.path.join(job_dir, name))
+        return images
+
+    return disk_galleries.get_or_create(job_id, scan)[since:]
+
+
+def _dir_images(prefix, directory):
+    previews = {}
+    preview_dir = os.path.join(directory, PREVIEW_DIR)
+    if os.path.isdir(preview_dir):
+        previews = {os.path.splitext(f)[0]: f for f in os.listdir(preview_dir)}
+    images = []
+    for f in sorted(os.listdir(directory)):
+        if not f.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        preview = previews.get(os.path.splitext(f)[0])
+        preview_path = f"{prefix}/{PREVIEW_DIR}/{preview}" if preview else f"{prefix}/{f}"
+        images.append(gallery_entry(f"{prefix}/{f}", preview_path))
+    return images
 
 app = Flask(__name__)
 
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.time()
+    g.request_timer = time.perf_counter()
+
+
+# Times every route, and adds requests about a job (?job= or /jobs/<id>) to that job's trace.
+# For the event stream this is the time to open it, not how long it stays open.
+@app.after_request
+def record_request_time(response):
+    if 'request_timer' in g:
+        seconds = time.perf_counter() - g.request_timer
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        REQUEST_SECONDS.observe(route, seconds)
+        job = scheduler.get(request.args.get('job') or (request.view_args or {}).get('job_id', ''))
+        if job is not None:
+            job.trace.add('request', seconds, g.request_started, route=route)
+    return response
+
 FORM_HTML = '''
 <!DOCTYPE html>
 <html>
@@ -26,8 +217,21 @@ FORM_HTML = '''
             <input type="text" name="player_name" placeholder="Player Name" required><br>
             <input type="number" name="pick_number" placeholder="Pick Number" required><br>
             <input type="number" name="num_samples" placeholder="How many images? (default 15)" min="1" value="15"><br>
+            <select name="profile">
+                {% for name in profiles %}<option value="{{ name }}" {% if name == default_profile %}selected{% endif %}>{{ name }}</option>{% endfor %}
+            </select><br>
+            <label><input type="checkbox" name="progressive"> Show quick previews first</label><br>
             <button type="submit">Generate Images</button>
         </form>
+        <h2>Batch</h2>
+        <form method="post" action="/generate_batch">
+            <textarea name="picks" rows="8" cols="32" placeholder="One pick per line, e.g.&#10;33. Cam Ward&#10;34. Travis Hunter" required></textarea><br>
+            <input type="number" name="num_samples" placeholder="Images per player (default 15)" min="1" value="15"><br>
+            <select name="profile">
+                {% for name in profiles %}<option value="{{ name }}" {% if name == default_profile %}selected{% endif %}>{{ name }}</option>{% endfor %}
+            </select><br>
+            <button type="submit">Generate Batch</button>
+        </form>
         {% if error %}<div style="color: red;">{{ error }}</div>{% endif %}
     </div>
 </body>
@@ -44,55 +248,152 @@ GALLERY_HTML = '''
         body { background: #111; color: #fff; font-family: sans-serif; text-align: center; }
         .gallery { display: flex; flex-wrap: wrap; gap: 1em; justify-content: center; }
         img { max-width: 300px; border: 2px solid #fff; background: #222; padding: 5px; border-radius: 8px; }
+        .tile { display: flex; flex-direction: column; }
+        .tile.draft img { opacity: 0.6; border-style: dashed; cursor: pointer; }
+        .tile.draft.requested img { border-color: #4af; }
         a { color: #4af; }
     </style>
 </head>
 <body>
     <h1>Generated Images for {{ player_name }}</h1>
+    <div id="status">{{ status }}</div>
+    {% if job_id %}<a href="/download?job={{ job_id|urlencode }}">Download all (.zip)</a>{% endif %}
+    <ul id="players"></ul>
     <div class="gallery" id="gallery">
         {% for img in images %}
-            <img src="/final_graphics/{{ img }}" alt="{{ img }}">
+            <div class="tile" data-file="{{ img.file }}">
+                <a href="{{ img.url }}" target="_blank"><img src="{{ img.preview_url }}" alt="{{ img.file }}" loading="lazy"></a>
+                <a href="{{ img.url }}" download>download</a>
+            </div>
         {% endfor %}
     </div>
     <br><a href="/">&larr; Generate another</a>
     <script>
-    const playerName = {{ player_name|tojson }};
-    let currentImages = Array.from(document.querySelectorAll('#gallery img')).map(img => img.getAttribute('src'));
+    const jobId = {{ job_id|tojson }};
+    let currentImages = Array.from(document.querySelectorAll('#gallery .tile')).map(tile => tile.dataset.file);
+    let cursor = currentImages.length;
+    // Shows the small preview; the full-resolution file is only fetched when opened or downloaded.
+    // A draft's tile is upgraded in place when its full render arrives.
+    function addImage(image) {
+        const draft = document.querySelector(`#gallery .tile.draft[data-file="${CSS.escape(image.file)}"]`);
+        if (draft) {
+            draft.classList.remove('draft');
+            const [open, download] = draft.querySelectorAll('a');
+            open.href = download.href = image.url;
+            open.target = '_blank';
+            open.onclick = null;
+            draft.querySelector('img').src = image.preview_url;
+            download.hidden = false;
+            return;
+        }
+        if (currentImages.includes(image.file)) return;
+        const tile = document.createElement('div');
+        tile.className = 'tile';
+        tile.dataset.file = image.file;
+        const open = document.createElement('a');
+        open.href = image.url;
+        open.target = '_blank';
+        const el = document.createElement('img');
+        el.src = image.preview_url;
+        el.alt = image.file;
+        open.appendChild(el);
+        const download = document.createElement('a');
+        download.href = open.href;
+        download.download = '';
+        download.textContent = 'download';
+        tile.append(open, download);
+        document.getElementById('gallery').appendChild(tile);
+        currentImages.push(image.file);
+    }
+    // A progressive job's quick composite of a photo; clicking it asks for that one to be rendered next
+    function addDraft(image) {
+        if (currentImages.includes(image.file)) return;
+        addImage(image);
+        const tile = document.querySelector(`#gallery .tile[data-file="${CSS.escape(image.file)}"]`);
+        tile.classList.add('draft');
+        const [open, download] = tile.querySelectorAll('a');
+        download.hidden = true;
+        open.href = '#';
+        open.removeAttribute('target');
+        open.onclick = e => {
+            e.preventDefault();
+            tile.classList.add('requested');
+            fetch(`/jobs/${encodeURIComponent(jobId)}/prioritize`, {
+                method: 'POST', headers: {'Content-Type': 'application/json'}, body: JSON.stringify({file: image.file}),
+            });
+        };
+    }
+    // Only asks for images added since the last fetch
+    let polling = null;
     function fetchImages() {
-        fetch(`/gallery_data?player_name=${encodeURIComponent(playerName)}`)
+        fetch(`/gallery_data?job=${encodeURIComponent(jobId)}&since=${cursor}`)
             .then(resp => resp.json())
             .then(data => {
-                const gallery = document.getElementById('gallery');
-                const newImages = data.images.map(img => `/final_graphics/${img}`);
-                // Only append new images
-                newImages.forEach((src, idx) => {
-                    if (!currentImages.includes(src)) {
-                        const el = document.createElement('img');
-                        el.src = src;
-                        el.alt = data.images[idx];
-                        gallery.appendChild(el);
-                        currentImages.push(src);
-                    }
-                });
+                data.images.forEach(addImage);
+                cursor = data.cursor;
+                // The job has finished, so nothing more will be added
+                if (data.status === 'done' || data.status === 'failed') {
+                    clearInterval(polling);
+                    document.getElementById('status').textContent = data.status;
+                }
             });
     }
-    setInterval(fetchImages, 100); // Poll every 100ms
+    function startPolling() {
+        polling = setInterval(fetchImages, 100); // Fallback: poll every 100ms
+    }
+    if (window.EventSource) {
+        // Each finished graphic is pushed once; "done" means nothing more is coming
+        const source = new EventSource(`/gallery_stream?job=${encodeURIComponent(jobId)}`);
+        source.addEventListener('image', e => addImage(JSON.parse(e.data)));
+        source.addEventListener('draft', e => addDraft(JSON.parse(e.data)));
+        // The draft's full render won't arrive, so it isn't kept as if it were a graphic
+        source.addEventListener('draft_failed', e => {
+            const file = JSON.parse(e.data).file;
+            const tile = document.querySelector(`#gallery .tile.draft[data-file="${CSS.escape(file)}"]`);
+            if (tile) tile.remove();
+            currentImages = currentImages.filter(existing => existing !== file);
+        });
+        // Batch jobs report each player as it finishes, including the ones that couldn't be generated
+        source.addEventListener('player', e => {
+            const entry = JSON.parse(e.data);
+            const item = document.createElement('li');
+            item.textContent = entry.ok ? `Pick ${entry.pick}: ${entry.name} (${entry.count} images)`
+                                        : `Pick ${entry.pick}: ${entry.error}`;
+            document.getElementById('players').appendChild(item);
+        });
+        source.addEventListener('done', e => {
+            source.close();
+            const data = JSON.parse(e.data);
+            if (data.status) document.getElementById('status').textContent = data.error || data.status;
+        });
+        source.onerror = () => { source.close(); fetchImages(); startPolling(); };
+    } else {
+        startPolling();
+    }
     </script>
 </body>
 </html>
 '''
 
+def render_form(error=None):
+    profiles = [name for name in OUTPUT_PROFILES if name != PREVIEW_PROFILE]
+    return render_template_string(FORM_HTML, error=error, profiles=profiles, default_profile=OUTPUT_PROFILE)
+
 @app.route('/', methods=['GET'])
 def index():
-    return render_template_string(FORM_HTML, error=None)
+    return render_form(error=None)
 
 @app.route('/generate', methods=['POST'])
 def generate():
     player_name = request.form.get('player_name', '').strip()
     pick_number = request.form.get('pick_number', '').strip()
     num_samples = request.form.get('num_samples', '').strip()
+    profile = request.form.get('profile', '').strip() or OUTPUT_PROFILE
+    progressive = request.form.get('progressive', '') in ('on', '1', 'true')
+    if profile not in OUTPUT_PROFILES:
+        return render_form(error=f"Unknown output profile: {profile}")
     if not player_name or not pick_number.isdigit():
-        return render_template_string(FORM_HTML, error="Please enter valid player name and pick number.")
+        return render_form(error="Please enter valid player name and pick number.")
     try:
         num_samples = int(num_samples)
         if num_samples <= 0:
@@ -103,40 +404,217 @@ def generate():
     # Check if player exists before starting background task
     player_data = find_closest_player(player_name)
     if not player_data:
-        return render_template_string(FORM_HTML, error=f"Could not find player: {player_name}")
+        return render_form(error=f"Could not find player: {player_name}")
 
     corrected_name = player_data['Name']
 
-    # Start image generation in background
-    def bg_task():
-        run_player_image_pipeline(corrected_name, pick_number, num_samples=num_samples)
-    Thread(target=bg_task, daemon=True).start()
+    # Queue image generation in the background
+    job = scheduler.submit(player_name=corrected_name, pick_number=int(pick_number), num_samples=num_samples,
+                           profile=profile, progressive=progressive)
+
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify({'job_id': job.id, 'status': job.status, 'player_name': corrected_name}), 202
+    # Redirect to the job's gallery
+    return redirect(url_for('gallery', job=job.id))
+
+# Queues a run of picks as one job. Takes a pasted pick list in the "picks" form field, or JSON
+# {"picks": [[player, pick], ...], "num_samples": ..., "profile": ...}. Players are matched as the batch
+# runs, and any that can't be are reported without stopping the rest.
+@app.route('/generate_batch', methods=['POST'])
+def generate_batch():
+    data = request.get_json(silent=True) if request.is_json else request.form
+    if data is None:
+        return jsonify({'error': 'Invalid JSON'}), 400
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    picks = data.get('picks') or []
+    if isinstance(picks, str):
+        picks = parse_pick_list(picks)
+    try:
+        picks = [(str(name), int(pick) if pick is not None else None) for name, pick in picks]
+    except (TypeError, ValueError):
+        picks = []
+    profile = str(data.get('profile') or '').strip() or OUTPUT_PROFILE
+    try:
+        num_samples = int(data.get('num_samples') or 15)
+        if num_samples <= 0:
+            num_samples = 15
+    except (TypeError, ValueError):
+        num_samples = 15
+
+    error = None
+    if profile not in OUTPUT_PROFILES:
+        error = f"Unknown output profile: {profile}"
+    elif not picks:
+        error = "Please enter at least one pick, one per line."
+    if error:
+        if request.is_json:
+            return jsonify({'error': error}), 400
+        return render_form(error=error)
+
+    job = scheduler.submit(picks=picks, num_samples=num_samples, profile=profile)
+    if request.is_json or request.accept_mimetypes.best == 'application/json':
+        return jsonify({'job_id': job.id, 'status': job.status, 'picks': picks}), 202
+    return redirect(url_for('gallery', job=job.id))
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = scheduler.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(dict(job.to_dict(), queue_position=scheduler.queue_position(job_id)))
+
+# Liveness: the process is up and answering
+@app.route('/healthz')
+def healthz():
+    return jsonify({'status': 'ok'})
+
+# Readiness: warm-up has finished, so prospect lookups, fonts and the template are already loaded
+@app.route('/readyz')
+def readyz():
+    if not warmed_up.is_set():
+        return jsonify({'status': 'warming up'}), 503
+    if 'error' in warm_up_report:
+        return jsonify({'status': 'warm-up failed', 'error': warm_up_report['error']}), 503
+    return jsonify({'status': 'ready', 'warm_up': warm_up_report['timings'],
+                    'queue_depth': scheduler.queue_depth(), 'active_jobs': scheduler.active_count()})
 
-    # Redirect to /gallery with corrected player name
-    return redirect(url_for('gallery', player_name=corrected_name))
+# Moves one of a progressive job's pending full renders to the front, given its gallery file path as JSON {"file": ...}
+@app.route('/jobs/<job_id>/prioritize', methods=['POST'])
+def prioritize(job_id):
+    job = scheduler.get(job_id)
+    if job is None or job.renders is None:
+        return jsonify({'error': 'Unknown or non-progressive job'}), 404
+    data = request.get_json(silent=True) or {}
+    prefix = f"{job.id}/"
+    file = data.get('file', '')
+    if not isinstance(file, str) or not file.startswith(prefix):
+        return jsonify({'error': 'Expected {"file": <path of a graphic in this job>}'}), 400
+    return jsonify({'promoted': job.renders.promote(file[len(prefix):])})
+
+# Per-stage timings of one job, as spans relative to when it was submitted plus per-stage totals
+@app.route('/jobs/<job_id>/trace')
+def job_trace(job_id):
+    job = scheduler.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(dict(job.trace.to_dict(), id=job.id, status=job.status))
+
+# Prometheus scrape endpoint
+@app.route('/metrics')
+def metrics():
+    lines = STAGE_SECONDS.render() + REQUEST_SECONDS.render()
+    lines += render_gauge('drafter_queue_depth', "Jobs waiting for a worker.", scheduler.queue_depth())
+    lines += render_gauge('drafter_active_jobs', "Jobs currently rendering.", scheduler.active_count())
+    lines += render_gauge('drafter_jobs', "Retained jobs by status.", scheduler.status_counts(), label='status')
+    budget = get_memory_budget()
+    lines += render_gauge('drafter_memory_budget_bytes', "Memory queued and running composites may use.",
+                          budget.limit)
+    lines += render_gauge('drafter_memory_budget_used_bytes', "Memory reserved by queued and running composites.",
+                          budget.used)
+    return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
 
 @app.route('/gallery')
 def gallery():
-    player_name = request.args.get('player_name', '')
-    images = [f for f in os.listdir(gallery_dir)
-              if f.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.webp')) and
-              player_name.lower().replace(' ', '_') in f.lower()]
-    images.sort()
-    return render_template_string(GALLERY_HTML, images=images, player_name=player_name)
+    job_id = request.args.get('job', '')
+    job = scheduler.get(job_id)
+    if job is None:
+        player_name = job_id
+    elif 'picks' in job.params:
+        player_name = f"{len(job.params['picks'])} picks"
+    else:
+        player_name = job.params['player_name']
+    status = job.status if job else ''
+    return render_template_string(GALLERY_HTML, images=job_images(job_id), player_name=player_name,
+                                  job_id=job_id, status=status)
 
+# The job's images, or with ?since=<cursor> only those added after the cursor from an earlier response
 @app.route('/gallery_data')
 def gallery_data():
-    player_name = request.args.get('player_name', '')
-    images = [f for f in os.listdir(gallery_dir)
-              if f.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.webp')) and
-              player_name.lower().replace(' ', '_') in f.lower()]
-    images.sort()
-    return jsonify({'images': images})
-
-# Serve static images from final_graphics
+    job_id = request.args.get('job', '')
+    since = request.args.get('since', 0, type=int)
+    job = scheduler.get(job_id)
+    images = job_images(job_id, max(since, 0))
+    return jsonify({'images': images, 'cursor': max(since, 0) + len(images), 'status': job.status if job else None})
+
+# Server-Sent Events feed of a job's graphics as the pipeline finishes them
+@app.route('/gallery_stream')
+def gallery_stream():
+    job = scheduler.get(request.args.get('job', ''))
+    events = job.events if job else None
+    try:
+        cursor = int(request.headers.get('Last-Event-ID', 0))
+    except ValueError:
+        cursor = 0
+
+    def stream():
+        nonlocal cursor
+        if events is None:
+            # Job no longer in memory; the page already rendered what's on disk
+            yield 'event: done\ndata: {}\n\n'
+            return
+        while True:
+            new_events = events.wait(cursor, timeout=STREAM_HEARTBEAT)
+            if not new_events:
+                yield ': keep-alive\n\n'
+                continue
+            for event in new_events:
+                cursor += 1
+                yield f"id: {cursor}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+                if event['type'] == 'done':
+                    return
+
+    return Response(stream_with_context(stream()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+# The job's full-size graphics as one ZIP, streamed as they're made when the job is still running
+@app.route('/download')
+def download():
+    job_id = request.args.get('job', '')
+    job = scheduler.get(job_id)
+    if job is None and not job_images(job_id):
+        abort(404)
+
+    def graphics():
+        if job is None:
+            files = [image['file'] for image in job_images(job_id)]
+        else:
+            files = _job_files(job.events)
+        for file in files:
+            # Inside the archive, paths are relative to the job (batch jobs keep their per-player folders)
+            yield os.path.join(gallery_dir, file), file.split('/', 1)[1]
+
+    return Response(stream_with_context(stream_zip(graphics())), mimetype='application/zip',
+                    headers={'Content-Disposition': f'attachment; filename="drafter_{job_id}.zip"',
+                             'X-Accel-Buffering': 'no'})
+
+
+# Files of a running job's graphics, as its event log announces them, until it's done
+def _job_files(events):
+    cursor = 0
+    while True:
+        new_events = events.wait(cursor, timeout=STREAM_HEARTBEAT)
+        for event in new_events:
+            cursor += 1
+            if event['type'] == 'image':
+                yield event['file']
+            elif event['type'] == 'done':
+                return
+
+# Serve static images from final_graphics with a strong ETag of their contents.
+# Requested at their versioned URL (?v=<digest>) they're cacheable forever; otherwise clients revalidate.
 def _static_serve(path):
-    from flask import send_from_directory
-    return send_from_directory(gallery_dir, path)
+    full_path = safe_join(gallery_dir, path)
+    if full_path is None or not os.path.isfile(full_path):
+        abort(404)
+    digest = file_digests.get(full_path)
+    versioned = request.args.get('v') == digest
+    # Without max_age, send_file marks the response no-cache
+    response = send_file(full_path, etag=digest, conditional=True, max_age=IMMUTABLE_MAX_AGE if versioned else None)
+    if versioned:
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+    return response
 
 app.add_url_rule('/final_graphics/<path:path>', 'static_files', _static_serve)
 
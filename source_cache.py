@@ -0,0 +1,181 @@
+import contextlib
+import hashlib
+import json
+import os
+import threading
+import time
+
+SOURCE_CACHE_DIR = os.environ.get('DRAFTER_SOURCE_CACHE', os.path.join('cache', 'sources'))
+# Total size the cached photos may take before the least recently used are evicted
+SOURCE_CACHE_MAX_BYTES = int(os.environ.get('DRAFTER_SOURCE_CACHE_MB', 2048)) * 1024 * 1024
+# Photos unused for this long are evicted regardless of size
+SOURCE_CACHE_MAX_AGE = int(os.environ.get('DRAFTER_SOURCE_CACHE_DAYS', 14)) * 24 * 60 * 60
+
+
+# Normalized search query, so "Cam Ward " and "cam ward" share cache entries
+def normalize_query(query):
+    return " ".join(query.lower().split())
+
+
+# Yields a temporary path to write the new contents of path to, which replaces path once the block completes,
+# so readers never see a half-written file. The name is unique to the process and thread, so writers racing
+# on the same path each finish their own file and the last one wins.
+@contextlib.contextmanager
+def atomic_path(path):
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        yield temp_path
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def write_atomic(path, data):
+    with atomic_path(path) as temp_path, open(temp_path, 'wb') as f:
+        f.write(data)
+
+
+class SourceCache:
+    """
+    On-disk, content-addressed store of downloaded source photos.
+
+    Each photo is stored once under objects/ by its SHA-256, and a small JSON
+    manifest per search query lists the photos that query returned, in the
+    order they were found. Reading a photo refreshes its mtime, which drives
+    both the age and the size based eviction.
+    """
+
+    def __init__(self, root=SOURCE_CACHE_DIR, max_bytes=SOURCE_CACHE_MAX_BYTES, max_age=SOURCE_CACHE_MAX_AGE):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+
+    def _object_path(self, digest):
+        return os.path.join(self.root, 'objects', digest[:2], digest)
+
+    def _manifest_path(self, query):
+        key = hashlib.sha1(normalize_query(query).encode('utf-8')).hexdigest()
+        return os.path.join(self.root, 'queries', f"{key}.json")
+
+    def _selection_path(self, key):
+        key = hashlib.sha1(normalize_query(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.root, 'selections', f"{key}.json")
+
+    def _read_manifest(self, query):
+        try:
+            with open(self._manifest_path(query), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'query': normalize_query(query), 'images': []}
+
+    # Stores a photo found for query and returns its digest
+    def put(self, query, data):
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            write_atomic(path, data)
+        with self._lock:
+            manifest = self._read_manifest(query)
+            if digest not in manifest['images']:
+                manifest['images'].append(digest)
+                manifest['updated'] = time.time()
+                manifest_path = self._manifest_path(query)
+                os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+                write_atomic(manifest_path, json.dumps(manifest).encode('utf-8'))
+        return digest
+
+    # Yields (digest, bytes) of the photos cached for query, in the order they were found, reading each
+    # only when it's asked for. Digests in skip (checked as each comes up) aren't read, and only photos
+    # actually read count as used for eviction.
+    def get(self, query, skip=()):
+        return self._read_objects(self._read_manifest(query)['images'], skip)
+
+    # Records which photos a run used, in the order it used them, so the next run for key can replay exactly those
+    # Best-effort: without it the next run only loses the replay
+    def save_selection(self, key, digests):
+        path = self._selection_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            write_atomic(path, json.dumps({'key': normalize_query(key), 'images': list(digests)}).encode('utf-8'))
+        except OSError as e:
+            print(f"Could not record the photos used for {key}: {e}")
+
+    # Like get, for the photos last recorded with save_selection for key
+    def get_selection(self, key, skip=()):
+        try:
+            with open(self._selection_path(key), encoding='utf-8') as f:
+                digests = json.load(f)['images']
+        except (OSError, ValueError, KeyError):
+            digests = []
+        return self._read_objects(digests, skip)
+
+    def _read_objects(self, digests, skip):
+        for digest in digests:
+            if digest in skip:
+                continue
+            path = self._object_path(digest)
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+                now = time.time()
+                os.utime(path, (now, now))
+            except OSError:
+                continue  # Evicted since the manifest was written
+            yield digest, data
+
+    def count(self, query):
+        return sum(os.path.exists(self._object_path(d)) for d in self._read_manifest(query)['images'])
+
+    # Drops photos unused for max_age, then the least recently used until the cache fits max_bytes
+    def evict(self):
+        removed = evict_files(os.path.join(self.root, 'objects'), self.max_bytes, self.max_age)
+        if removed:
+            print(f"Evicted {removed} cached source images")
+        return removed
+
+
+# Deletes files under directory unused (by mtime) for max_age seconds, then the oldest
+# until the rest fit in max_bytes. Returns how many files were removed.
+def evict_files(directory, max_bytes, max_age):
+    if not os.path.isdir(directory):
+        return 0
+    entries = []
+    for dirpath, _, filenames in os.walk(directory):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+    entries.sort()
+
+    now = time.time()
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for mtime, size, path in entries:
+        if now - mtime <= max_age and total <= max_bytes:
+            break
+        try:
+            os.unlink(path)
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+    return removed
+
+
+_default_cache = None
+
+
+def get_source_cache():
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = SourceCache()
+    return _default_cache
@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+import pytest
+
+from prospect_index import ProspectIndex
+from scrapers.refresh import PROSPECT_STORE_FILE, SOURCES, STATE_FILE, refresh
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+CBS_PATH = urlsplit(SOURCES['cbs'].url).path
+PFF_PATH = urlsplit(SOURCES['pff'].url).path
+
+
+class BoardServer:
+    """
+    Serves the saved board pages at their published paths with an ETag, answering conditional requests with 304.
+    With send_validators off, pages are served without an ETag or Last-Modified.
+    """
+
+    def __init__(self):
+        self.pages = {}
+        for path, filename in ((CBS_PATH, 'cbs_prospect_rankings.html'), (PFF_PATH, 'pff_draft_profiles.html')):
+            with open(os.path.join(FIXTURES, filename), 'rb') as f:
+                self.pages[path] = f.read()
+        self.failing = set()
+        self.send_validators = True
+        self.requests = []
+        board = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                board.requests.append(
+                    (self.path, self.headers.get('If-None-Match'), self.headers.get('If-Modified-Since'))
+                )
+                if self.path in board.failing or self.path not in board.pages:
+                    self.send_response(500 if self.path in board.failing else 404)
+                    self.end_headers()
+                    return
+                body = board.pages[self.path]
+                etag = f'"{hashlib.sha1(body).hexdigest()}"'
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                if board.send_validators:
+                    self.send_header('ETag', etag)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.base_url = f'http://127.0.0.1:{self.server.server_port}/'
+
+
+@pytest.fixture
+def board_server():
+    board = BoardServer()
+    thread = threading.Thread(target=board.server.serve_forever, daemon=True)
+    thread.start()
+    yield board
+    board.server.shutdown()
+    board.server.server_close()
+
+
+def statuses(results):
+    return {result['source']: result['status'] for result in results}
+
+
+def read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def test_first_refresh_updates_and_compiles_the_store(board_server, tmp_path):
+    results = refresh(base_url=board_server.base_url, data_dir=str(tmp_path))
+
+    assert statuses(results) == {'cbs': 'updated', 'pff': 'updated'}
+    assert all(etag is None for _, etag, _ in board_server.requests)
+    with open(tmp_path / PROSPECT_STORE_FILE, encoding='utf-8') as f:
+        players = json.load(f)['players']
+    names = [player['Name'] for player in players]
+    # CBS is listed first, so it wins for players on both boards, under whichever form of the name it uses
+    assert names[:3] == ['Travis Hunter', 'Abdul Carter', 'Cam Ward']
+    assert 'Cameron Ward' not in names and 'Emery Jones' not in names and 'Ricky White' not in names
+    assert [player['Name'] for player in players if player['Source'] == 'pff'] == ['Shedeur Sanders', 'Ollie Gordon']
+    assert len(players) == 12
+
+    index = ProspectIndex(str(tmp_path / PROSPECT_STORE_FILE))
+    assert index.best_match('emery jones')['Name'] == 'Emery Jones Jr.'
+
+
+def test_unchanged_pages_are_revalidated_and_kept(board_server, tmp_path):
+    refresh(base_url=board_server.base_url, data_dir=str(tmp_path))
+    store = read(tmp_path / PROSPECT_STORE_FILE)
+    board_server.requests.clear()
+
+    results = refresh(base_url=board_server.base_url, data_dir=str(tmp_path))
+
+    assert statuses(results) == {'cbs': 'unchanged', 'pff': 'unchanged'}
+    assert all(etag for _, etag, _ in board_server.requests)
+    # Nothing changed, so the store isn't recompiled
+    assert read(tmp_path / PROSPECT_STORE_FILE) == store
+
+
+def test_failed_fetch_keeps_the_last_snapshot(board_server, tmp_path):
+    refresh(base_url=board_server.base_url, data_dir=str(tmp_path))
+    snapshot = read(tmp_path / SOURCES['pff'].filename)
+    with open(tmp_path / STATE_FILE, encoding='utf-8') as f:
+        validators = json.load(f)['pff']
+
+    board_server.failing.add(PFF_PATH)
+    board_server.pages[CBS_PATH] = board_server.pages[CBS_PATH].replace(b'Travis Hunter', b'Travis Hunter Jr.')
+    results = refresh(base_url=board_server.base_url, data_dir=str(tmp_path))
+
+    assert statuses(results) == {'cbs': 'updated', 'pff': 'failed'}
+    assert read(tmp_path / SOURCES['pff'].filename) == snapshot
+    with open(tmp_path / STATE_FILE, encoding='utf-8') as f:
+        assert json.load(f)['pff'] == validators
+    # The store is recompiled from CBS's new page and PFF's last good snapshot
+    with open(tmp_path / PROSPECT_STORE_FILE, encoding='utf-8') as f:
+        names = [player['Name'] for player in json.load(f)['players']]
+    assert names[0] == 'Travis Hunter Jr.' and 'Shedeur Sanders' in names
+
+
+def test_page_without_players_keeps_the_last_snapshot(board_server, tmp_path):
+    refresh(base_url=board_server.base_url, data_dir=str(tmp_path))
+    snapshot = read(tmp_path / SOURCES['pff'].filename)
+
+    board_server.pages[PFF_PATH] = b'<html><body><div class="article-content">Coming soon</div></body></html>'
+    results = refresh(['pff'], base_url=board_server.base_url, data_dir=str(tmp_path))
+
+    assert statuses(results) == {'pff': 'failed'}
+    assert read(tmp_path / SOURCES['pff'].filename) == snapshot
+
+
+def test_pages_without_validators_are_fetched_unconditionally(board_server, tmp_path):
+    board_server.send_validators = False
+    refresh(base_url=board_server.base_url, data_dir=str(tmp_path))
+    board_server.requests.clear()
+
+    results = refresh(base_url=board_server.base_url, data_dir=str(tmp_path))
+
+    # Nothing the server didn't send is made up and sent back, so a changed page can't be answered with 304
+    assert statuses(results) == {'cbs': 'updated', 'pff': 'updated'}
+    assert board_server.requests and all(etag is None and since is None for _, etag, since in board_server.requests)
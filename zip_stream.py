@@ -0,0 +1,58 @@
+import zipfile
+
+# Bytes read from a file, and at most buffered, between chunks handed to the client
+ZIP_CHUNK_SIZE = 64 * 1024
+
+
+class _ChunkBuffer:
+    """
+    Write-only sink for ZipFile that collects output until it's taken.
+
+    It has no tell() or seek(), so ZipFile writes sizes and CRCs after each
+    entry's data instead of going back to patch the local header, which is
+    what lets the archive be sent as it's written.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_zip(entries):
+    """
+    Yields a ZIP archive of `entries`, (path, name in archive) pairs, chunk
+    by chunk.
+
+    `entries` may be a generator that's still producing paths, so the archive
+    can be sent while the files in it are being made. Only one chunk of one
+    file is held at a time, however many files there are. The graphics are
+    already compressed, so they're stored as-is rather than deflated again.
+    Paths that have disappeared by the time they're reached are skipped.
+    """
+    sink = _ChunkBuffer()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for path, arcname in entries:
+            try:
+                info = zipfile.ZipInfo.from_file(path, arcname)
+                source = open(path, 'rb')
+            except FileNotFoundError:
+                continue
+            info.compress_type = zipfile.ZIP_STORED
+            with source, archive.open(info, 'w') as dest:
+                for chunk in iter(lambda: source.read(ZIP_CHUNK_SIZE), b''):
+                    dest.write(chunk)
+                    yield sink.take()
+            yield sink.take()
+    # Closing the archive writes its central directory
+    yield sink.take()